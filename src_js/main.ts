@@ -15,11 +15,13 @@ type GlobalComponent = LocalComponent & {
     mid: number,
     blessing_req: {
         token: number | null,
-        timestamp: number | null
+        timestamp: number | null,
+        standby: boolean
     },
     blessing_res: {
         token: number | null,
-        ready: boolean
+        ready: boolean,
+        standby: boolean
     }
 };
 
@@ -1,6 +1,7 @@
 """Common functionality shared between clients and monitor server"""
 
 import importlib.resources
+import random
 import typing
 
 from hat import json
@@ -22,18 +23,73 @@ Cid: typing.TypeAlias = int
 
 Mid: typing.TypeAlias = int
 
+_max_backoff_exp = 64
+
 
 class BlessingReq(typing.NamedTuple):
     token: int | None
     timestamp: float | None
+    standby: bool = False
 
 
 class BlessingRes(typing.NamedTuple):
     token: int | None
     ready: bool
+    standby: bool = False
+
+
+class EncodedData:
+    """JSON data available in its encoded form
+
+    Data is decoded lazily - only when `data` property is accessed. Once
+    decoded, data is cached.
+
+    Instances are compared by their encoded representation and, in case
+    encoded representations differ, by decoded data. Instances can also be
+    compared to decoded JSON data. Hash is calculated from decoded data
+    (objects and arrays are hashed by their content), so equal instances
+    have equal hashes.
+
+    """
+
+    __slots__ = ('_encoded', '_data', '_is_decoded')
+
+    def __init__(self, encoded: str):
+        self._encoded = encoded
+        self._data = None
+        self._is_decoded = False
+
+    @property
+    def encoded(self) -> str:
+        """Encoded data"""
+        return self._encoded
+
+    @property
+    def data(self) -> json.Data:
+        """Decoded data"""
+        if not self._is_decoded:
+            self._data = json.decode(self._encoded)
+            self._is_decoded = True
 
+        return self._data
 
-class ComponentInfo(typing.NamedTuple):
+    def __eq__(self, other):
+        if isinstance(other, EncodedData):
+            if self._encoded == other._encoded:
+                return True
+
+            other = other.data
+
+        return self.data == other
+
+    def __hash__(self):
+        return hash(_freeze_data(self.data))
+
+    def __repr__(self):
+        return f'EncodedData({self._encoded!r})'
+
+
+class _ComponentInfo(typing.NamedTuple):
     cid: Cid
     mid: Mid
     name: str | None
@@ -42,3 +98,81 @@ class ComponentInfo(typing.NamedTuple):
     rank: int
     blessing_req: BlessingReq
     blessing_res: BlessingRes
+
+
+class ComponentInfo(_ComponentInfo):
+    """Component info
+
+    Component's `data` can be provided as JSON data or as `EncodedData`.
+    In both cases, `data` property (as well as indexing, iteration and
+    `_asdict`) returns decoded JSON data. If `data` is provided as
+    `EncodedData`, its encoded form is reused when component info is
+    serialized (see `encoded_data`) and is preserved by `_replace`.
+
+    """
+
+    __slots__ = ()
+
+    @property
+    def data(self) -> json.Data:
+        """Component data"""
+        return _decode_data(super().data)
+
+    @property
+    def encoded_data(self) -> str:
+        """JSON encoded component data"""
+        data = super().data
+        return (data.encoded if isinstance(data, EncodedData)
+                else json.encode(data))
+
+    def __iter__(self):
+        return map(_decode_data, super().__iter__())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return tuple(map(_decode_data, super().__getitem__(key)))
+
+        return _decode_data(super().__getitem__(key))
+
+    def _replace(self, **kwargs):
+        result = self._make(map(kwargs.pop, self._fields, super().__iter__()))
+        if kwargs:
+            raise ValueError(f'Got unexpected field names: {list(kwargs)!r}')
+
+        return result
+
+
+def get_backoff_delay(attempt: int,
+                      delay: float,
+                      max_delay: float | None = None,
+                      jitter: bool = False
+                      ) -> float:
+    """Get delay prior to retrying after `attempt` unsuccessful attempts
+
+    If `max_delay` is set, `delay` is doubled for each unsuccessful attempt
+    and capped at `max_delay`. Otherwise, `delay` is constant. If `jitter`
+    is set, resulting delay is chosen uniformly at random between ``0`` and
+    calculated delay (full jitter).
+
+    """
+    if max_delay is not None:
+        delay = min(max_delay, delay * 2 ** min(attempt, _max_backoff_exp))
+
+    if jitter:
+        delay = random.uniform(0, delay)
+
+    return delay
+
+
+def _decode_data(data):
+    return data.data if isinstance(data, EncodedData) else data
+
+
+def _freeze_data(data):
+    if isinstance(data, dict):
+        return frozenset((k, _freeze_data(v)) for k, v in data.items())
+
+    if isinstance(data, list):
+        return tuple(_freeze_data(i) for i in data)
+
+    return data
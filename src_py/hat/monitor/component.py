@@ -1,6 +1,10 @@
 """Monitor Component"""
 
+from collections.abc import Collection
+import abc
 import asyncio
+import contextlib
+import itertools
 import logging
 import typing
 
@@ -24,6 +28,18 @@ Runner: typing.TypeAlias = aio.Resource
 RunnerCb: typing.TypeAlias = aio.AsyncCallable[['Component'], Runner]
 """Runner callback"""
 
+
+class StandbyRunner(aio.Resource):
+    """Component runner prepared during standby phase"""
+
+    @abc.abstractmethod
+    async def promote(self):
+        """Promote standby runner to active component runner"""
+
+
+StandbyCb: typing.TypeAlias = aio.AsyncCallable[['Component'], StandbyRunner]
+"""Standby callback"""
+
 StateCb: typing.TypeAlias = aio.AsyncCallable[['Component', State], None]
 """State callback"""
 
@@ -31,20 +47,47 @@ CloseReqCb: typing.TypeAlias = aio.AsyncCallable[['Component'], None]
 """Close request callback"""
 
 
+class ReconnectPolicy(typing.NamedTuple):
+    """Reconnect policy
+
+    Delay prior to n-th consecutive reconnect attempt is
+    ``min(max_delay, delay * 2 ** (n - 1))``. If `jitter` is set, actual
+    delay is chosen uniformly between ``0`` and calculated delay (full
+    jitter). Reconnecting stops after `max_attempts` unsuccessful attempts
+    (``None`` represents unlimited number of attempts).
+
+    Runner of active component keeps running for up to `grace_period`
+    seconds after connection is lost. If, during this period, component
+    reconnects and its blessing is confirmed by Monitor Server (see session
+    resume in `hat.monitor.observer.server.listen`), runner continues
+    running.
+
+    """
+    delay: float = 0.1
+    max_delay: float = 10
+    jitter: bool = True
+    max_attempts: int | None = None
+    grace_period: float = 0
+
+
 async def connect(addr: tcp.Address,
                   name: str,
                   group: str,
                   runner_cb: RunnerCb,
                   *,
+                  standby_cb: StandbyCb | None = None,
                   data: json.Data = None,
+                  subscription: Collection[str] | None = None,
+                  reconnect_policy: ReconnectPolicy | None = None,
                   state_cb: StateCb | None = None,
                   close_req_cb: CloseReqCb | None = None,
                   **kwargs
                   ) -> 'Component':
     """Connect to local monitor server and create component
 
-    Implementation of component behavior according to BLESS_ALL and BLESS_ONE
-    algorithms.
+    Implementation of component behavior according to BLESS_ALL, BLESS_ONE
+    and BLESS_N algorithms (including standby marking and make-before-break
+    handover).
 
     Component runs client's loop which manages blessing req/res states based on
     provided monitor client. Initially, component's ready is disabled.
@@ -59,32 +102,62 @@ async def connect(addr: tcp.Address,
 
     If runner is closed, while component remains active, component is closed.
 
-    If connection to Monitor Server is closed, component is also closed.
-    If component is closed while active, runner is closed.
+    If connection to Monitor Server is closed and `reconnect_policy` is not
+    set, component is also closed. Otherwise, component reconnects
+    according to `reconnect_policy` (resuming previous session) and is
+    closed only if reconnecting fails. While disconnected, component is not
+    considered active (unless in reconnect policy's grace period). If
+    component is closed while active, runner is closed.
+
+    If `standby_cb` is set, it is called when component is ready and
+    marked as standby by blessing algorithm (see blessing request's
+    `standby`). Result of calling `standby_cb` is standby runner which
+    can prepare user defined components activity. When component becomes
+    active, standby runner is promoted and used as component runner
+    (`runner_cb` is not called). Standby runner is closed if component
+    stops being standby without receiving blessing.
+
+    Once prepared for taking over (standby runner is created or
+    `standby_cb` is not set), component signals its readiness with
+    blessing response's `standby` flag (used by make-before-break handover).
+
+    Argument `subscription` limits components available in component's
+    state (see `hat.monitor.observer.client.connect`).
 
     Additional arguments are passed to `hat.monitor.observer.client.connect`.
 
     """
     component = Component()
+    component._async_group = aio.Group()
+    component._addr = addr
+    component._name = name
+    component._group = group
+    component._data = data
+    component._subscription = subscription
+    component._reconnect_policy = reconnect_policy
+    component._client_kwargs = kwargs
     component._runner_cb = runner_cb
+    component._standby_cb = standby_cb
+    component._standby_runner = None
+    component._standby_event = asyncio.Event()
     component._state_cb = state_cb
     component._close_req_cb = close_req_cb
     component._blessing_res = common.BlessingRes(token=None,
                                                  ready=False)
     component._change_event = asyncio.Event()
-
-    component._client = await client.connect(
-        addr, name, group,
-        data=data,
-        state_cb=component._on_client_state,
-        close_req_cb=component._on_client_close_req,
-        **kwargs)
+    component._client = None
 
     try:
+        component._client = await component._connect_client()
+
+        component.async_group.spawn(aio.call_on_cancel,
+                                    component._on_close)
+        component.async_group.spawn(component._connection_loop)
         component.async_group.spawn(component._component_loop)
+        component.async_group.spawn(component._standby_loop)
 
-    except Exception:
-        await aio.uncancellable(component._client.async_close())
+    except BaseException:
+        await aio.uncancellable(component.async_close())
         raise
 
     return component
@@ -100,7 +173,7 @@ class Component(aio.Resource):
     @property
     def async_group(self) -> aio.Group:
         """Async group"""
-        return self._client.async_group
+        return self._async_group
 
     @property
     def state(self) -> State:
@@ -119,8 +192,23 @@ class Component(aio.Resource):
 
         await self._change_blessing_res(ready=ready)
 
+    async def set_data(self, data: json.Data):
+        """Set data"""
+        self._data = data
+
+        with contextlib.suppress(ConnectionError):
+            await self._client.set_data(data)
+
+    async def _on_close(self):
+        if self._client:
+            await self._client.async_close()
+
     async def _on_client_state(self, c, state):
+        if c is not self._client:
+            return
+
         self._change_event.set()
+        self._standby_event.set()
 
         if not self._state_cb:
             return
@@ -128,16 +216,91 @@ class Component(aio.Resource):
         await aio.call(self._state_cb, self, state)
 
     async def _on_client_close_req(self, c):
-        if not self._close_req_cb:
+        if c is not self._client or not self._close_req_cb:
             return
 
         await aio.call(self._close_req_cb, self)
 
     async def _change_blessing_res(self, **kwargs):
         self._blessing_res = self._blessing_res._replace(**kwargs)
-        await self._client.set_blessing_res(self._blessing_res)
+
+        with contextlib.suppress(ConnectionError):
+            await self._client.set_blessing_res(self._blessing_res)
 
         self._change_event.set()
+        self._standby_event.set()
+
+    async def _connect_client(self):
+        return await client.connect(
+            self._addr, self._name, self._group,
+            data=self._data,
+            subscription=self._subscription,
+            blessing_res=self._blessing_res,
+            session=(self._client.session if self._client else None),
+            state_cb=self._on_client_state,
+            close_req_cb=self._on_client_close_req,
+            **self._client_kwargs)
+
+    async def _connection_loop(self):
+        mlog.debug("starting connection loop")
+        try:
+            while True:
+                await self._client.wait_closing()
+                await self._client.async_close()
+
+                self._change_event.set()
+                self._standby_event.set()
+
+                if not self._reconnect_policy:
+                    break
+
+                mlog.debug("connection lost - reconnecting")
+                if not await self._reconnect():
+                    mlog.debug("reconnecting failed")
+                    break
+
+                mlog.debug("reconnected")
+                self._change_event.set()
+                self._standby_event.set()
+
+        except Exception as e:
+            mlog.warning("connection loop error: %s", e, exc_info=e)
+
+        finally:
+            mlog.debug("stopping connection loop")
+            self.close()
+
+    async def _reconnect(self):
+        policy = self._reconnect_policy
+        attempts = (range(policy.max_attempts)
+                    if policy.max_attempts is not None
+                    else itertools.count())
+
+        for attempt in attempts:
+            delay = common.get_backoff_delay(attempt=attempt,
+                                             delay=policy.delay,
+                                             max_delay=policy.max_delay,
+                                             jitter=policy.jitter)
+            await asyncio.sleep(delay)
+
+            try:
+                self._client = await self._connect_client()
+                return True
+
+            except Exception as e:
+                mlog.debug("reconnect attempt failed: %s", e, exc_info=e)
+
+        return False
+
+    def _get_info(self):
+        if not self._is_synchronized():
+            return
+
+        return self._client.state.info
+
+    def _is_synchronized(self):
+        return (self._client.is_open and
+                self._client.state.version is not None)
 
     async def _component_loop(self):
         mlog.debug("starting component loop")
@@ -156,8 +319,7 @@ class Component(aio.Resource):
                     continue
 
                 try:
-                    mlog.debug("creating component runner")
-                    runner = await aio.call(self._runner_cb, self)
+                    runner = await self._create_runner()
 
                     try:
                         async with self.async_group.create_subgroup() as subgroup:  # NOQA
@@ -194,10 +356,116 @@ class Component(aio.Resource):
             mlog.debug("stopping component loop")
             self.close()
 
+    async def _create_runner(self):
+        runner = self._standby_runner
+        if not runner or not runner.is_open:
+            mlog.debug("creating component runner")
+            return await aio.call(self._runner_cb, self)
+
+        self._standby_runner = None
+        self._standby_event.set()
+
+        mlog.debug("promoting standby runner")
+        try:
+            await runner.promote()
+
+        except BaseException:
+            await aio.uncancellable(runner.async_close())
+            raise
+
+        return runner
+
+    async def _standby_loop(self):
+        mlog.debug("starting standby loop")
+        try:
+            while True:
+                mlog.debug("waiting standby")
+                await self._wait_standby(True)
+
+                runner = None
+                runner_closed = False
+
+                try:
+                    if self._standby_cb:
+                        mlog.debug("creating standby runner")
+                        runner = await aio.call(self._standby_cb, self)
+                        self._standby_runner = runner
+
+                    await self._change_blessing_res(standby=True)
+
+                    async with self.async_group.create_subgroup() as subgroup:
+                        tasks = [subgroup.spawn(self._wait_while_standby,
+                                                runner)]
+                        if runner:
+                            tasks.append(subgroup.spawn(runner.wait_closing))
+
+                        mlog.debug("wait while standby")
+                        await asyncio.wait(
+                            tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                        runner_closed = not tasks[0].done()
+
+                finally:
+                    if runner and self._standby_runner is runner:
+                        mlog.debug("closing standby runner")
+                        self._standby_runner = None
+                        await aio.uncancellable(runner.async_close())
+
+                if self._blessing_res.standby:
+                    await self._change_blessing_res(standby=False)
+
+                if runner_closed:
+                    mlog.debug("standby runner closed while standby")
+                    await self._wait_standby(False)
+
+        except ConnectionError:
+            pass
+
+        except Exception as e:
+            mlog.warning("standby loop error: %s", e, exc_info=e)
+
+        finally:
+            mlog.debug("stopping standby loop")
+            self.close()
+
+    async def _wait_standby(self, standby):
+        while True:
+            info = self._get_info()
+            if standby == bool(self._blessing_res.ready and
+                               info and
+                               info.blessing_req.standby and
+                               info.blessing_req.token is None):
+                return
+
+            await self._standby_event.wait()
+            self._standby_event.clear()
+
+    async def _wait_while_standby(self, runner):
+        while True:
+            if runner and self._standby_runner is not runner:
+                return
+
+            if not runner and self._blessing_res.token is not None:
+                return
+
+            if not self._blessing_res.ready:
+                return
+
+            info = self._get_info()
+            if not info:
+                return
+
+            if (not info.blessing_req.standby and
+                    info.blessing_req.token is None):
+                return
+
+            await self._standby_event.wait()
+            self._standby_event.clear()
+
     async def _get_blessed_and_ready_token(self):
         while True:
             if self._blessing_res.ready:
-                info = self._client.state.info
+                info = self._get_info()
                 token = info.blessing_req.token if info else None
 
                 if token is not None:
@@ -214,7 +482,7 @@ class Component(aio.Resource):
             if self._blessing_res.token is None:
                 return False
 
-            info = self._client.state.info
+            info = self._get_info()
             token = info.blessing_res.token if info else None
 
             if token == self._blessing_res.token:
@@ -224,15 +492,38 @@ class Component(aio.Resource):
             self._change_event.clear()
 
     async def _wait_while_blessed_and_ready(self):
+        loop = asyncio.get_running_loop()
+        grace_period = (self._reconnect_policy.grace_period
+                        if self._reconnect_policy else 0)
+        deadline = None
+
         while True:
             if not self._blessing_res.ready:
                 return
 
-            info = self._client.state.info
-            token = info.blessing_req.token if info else None
+            if self._is_synchronized():
+                deadline = None
+
+                info = self._client.state.info
+                token = info.blessing_req.token if info else None
+
+                if token is None or token != self._blessing_res.token:
+                    return
+
+            elif deadline is None:
+                mlog.debug("blessing unconfirmed - grace period started")
+                deadline = loop.time() + grace_period
 
-            if token is None or token != self._blessing_res.token:
+            if deadline is None:
+                await self._change_event.wait()
+
+            elif deadline > loop.time():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await aio.wait_for(self._change_event.wait(),
+                                       deadline - loop.time())
+
+            else:
+                mlog.debug("grace period expired")
                 return
 
-            await self._change_event.wait()
             self._change_event.clear()
@@ -1,11 +1,13 @@
 """Observer Client"""
 
+from collections.abc import Collection
+import bisect
+import itertools
 import logging
 import typing
 
 from hat import aio
 from hat import json
-from hat import util
 from hat.drivers import chatter
 from hat.drivers import tcp
 
@@ -23,9 +25,14 @@ CloseReqCb: typing.TypeAlias = aio.AsyncCallable[['Client'], None]
 
 
 class State(typing.NamedTuple):
-    """Client state"""
+    """Client state
+
+    Version is global components version received from server.
+
+    """
     info: common.ComponentInfo | None
     components: list[common.ComponentInfo]
+    version: int | None = None
 
 
 async def connect(addr: tcp.Address,
@@ -33,12 +40,30 @@ async def connect(addr: tcp.Address,
                   group: str,
                   *,
                   data: json.Data = None,
+                  subscription: Collection[str] | None = None,
+                  blessing_res: common.BlessingRes | None = None,
+                  session: common.Session | None = None,
                   state_cb: StateCb | None = None,
                   close_req_cb: CloseReqCb | None = None,
                   **kwargs
                   ) -> 'Client':
     """Connect to Observer Server
 
+    Argument `subscription` limits global components received from server.
+    If `subscription` is ``None``, all components are received. Otherwise,
+    only components with group contained in `subscription` (and client's
+    own component) are received - empty `subscription` results in
+    receiving only client's own component.
+
+    Argument `blessing_res` is initial blessing response (if ``None``,
+    response without token and with disabled ready is used).
+
+    If server supports session resume, it assigns session token to each
+    client (available as `Client.session`). Client reconnecting with
+    previously assigned `session` (and its last `blessing_res`) reclaims
+    its component (identifier, rank and blessing) if server still retains
+    it (see `hat.monitor.observer.server.listen`).
+
     Additional arguments are passed directly to `hat.drivers.chatter.connect`.
 
     """
@@ -49,6 +74,9 @@ async def connect(addr: tcp.Address,
                       name=name,
                       group=group,
                       data=data,
+                      subscription=subscription,
+                      blessing_res=blessing_res,
+                      session=session,
                       state_cb=state_cb,
                       close_req_cb=close_req_cb)
 
@@ -69,18 +97,29 @@ class Client(aio.Resource):
                  name: str,
                  group: str,
                  data: json.Data,
+                 subscription: Collection[str] | None,
+                 blessing_res: common.BlessingRes | None,
+                 session: common.Session | None,
                  state_cb: StateCb | None,
                  close_req_cb: CloseReqCb | None):
         self._conn = conn
         self._name = name
         self._group = group
         self._data = json.encode(data)
+        self._subscription = common.subscription_to_sbs(subscription)
         self._state_cb = state_cb
         self._close_req_cb = close_req_cb
         self._state = State(info=None,
                             components=[])
-        self._blessing_res = common.BlessingRes(token=None,
-                                                ready=False)
+        self._cid = None
+        self._mid = None
+        self._version = None
+        self._components = {}
+        self._component_ids = []
+        self._blessing_res = (blessing_res if blessing_res is not None
+                              else common.BlessingRes(token=None,
+                                                      ready=False))
+        self._session = session
 
         self.async_group.spawn(self._receive_loop)
 
@@ -94,6 +133,11 @@ class Client(aio.Resource):
         """Client's state"""
         return self._state
 
+    @property
+    def session(self) -> common.Session | None:
+        """Session token"""
+        return self._session
+
     async def set_blessing_res(self, res: common.BlessingRes):
         """Set blessing response"""
         if res == self._blessing_res:
@@ -102,6 +146,15 @@ class Client(aio.Resource):
         self._blessing_res = res
         await self._send_msg_client(res)
 
+    async def set_data(self, data: json.Data):
+        """Set component data"""
+        data = json.encode(data)
+        if data == self._data:
+            return
+
+        self._data = data
+        await self._send_msg_client(self._blessing_res)
+
     async def _receive_loop(self):
         mlog.debug("starting receive loop")
         try:
@@ -110,15 +163,28 @@ class Client(aio.Resource):
             while True:
                 msg_type, msg_data = await common.receive_msg(self._conn)
 
-                if msg_type == 'HatObserver.MsgServer':
+                if msg_type == 'HatObserver2.MsgServer':
                     mlog.debug("received msg server")
                     components = [common.component_info_from_sbs(i)
                                   for i in msg_data['components']]
-                    await self._process_msg_server(cid=msg_data['cid'],
-                                                   mid=msg_data['mid'],
-                                                   components=components)
-
-                elif msg_type == 'HatObserver.MsgClose':
+                    self._session = common.session_from_sbs(
+                        msg_data['session'])
+                    await self._process_msg_server(
+                        cid=msg_data['cid'],
+                        mid=msg_data['mid'],
+                        version=msg_data['version'],
+                        components=components)
+
+                elif msg_type == 'HatObserver2.MsgServerDelta':
+                    mlog.debug("received msg server delta")
+                    delta = common.components_delta_from_sbs(
+                        msg_data['delta'])
+                    await self._process_msg_server_delta(
+                        mid=msg_data['mid'],
+                        version=msg_data['version'],
+                        delta=delta)
+
+                elif msg_type == 'HatObserver2.MsgClose':
                     mlog.debug("received msg close")
                     if self._close_req_cb:
                         await aio.call(self._close_req_cb, self)
@@ -138,20 +204,77 @@ class Client(aio.Resource):
             self.close()
 
     async def _send_msg_client(self, blessing_res):
-        await common.send_msg(self._conn, 'HatObserver.MsgClient', {
+        await common.send_msg(self._conn, 'HatObserver2.MsgClient', {
             'name': self._name,
             'group': self._group,
             'data': self._data,
-            'blessingRes': common.blessing_res_to_sbs(blessing_res)})
-
-    async def _process_msg_server(self, cid, mid, components):
-        info = util.first(components, lambda i: (i.cid == cid and
-                                                 i.mid == mid))
-        state = State(info=info,
-                      components=components)
-        if self._state == state:
+            'blessingRes': common.blessing_res_to_sbs(blessing_res),
+            'subscription': self._subscription,
+            'session': common.session_to_sbs(self._session)})
+
+    async def _process_msg_server(self, cid, mid, version, components):
+        # without subscription, snapshot with unchanged version contains
+        # already received components
+        if (cid == self._cid and
+                mid == self._mid and
+                version == self._version and
+                common.subscription_from_sbs(self._subscription) is None):
             return
 
+        self._cid = cid
+        self._mid = mid
+        self._version = version
+        self._components = {common.get_component_id(i): i
+                            for i in components}
+        self._component_ids = sorted(self._components.keys())
+
+        state = self._get_state()
+
+        # snapshot with new version can still contain unchanged components
+        # (e.g. initial snapshot without components or, with subscription,
+        # changes limited to components not subscribed to) and, with
+        # subscription, snapshots with the same version can contain
+        # different components (server applies subscription once it receives
+        # MsgClient) - content is compared only in these cases, for which
+        # snapshot is already decoded in its entirety
+        if (state.info == self._state.info and
+                state.components == self._state.components):
+            self._state = state
+            return
+
+        await self._set_state(state)
+
+    async def _process_msg_server_delta(self, mid, version, delta):
+        if self._version is None:
+            raise Exception('delta received prior to initial state')
+
+        self._mid = mid
+        self._version = version
+
+        for component_id in delta.removed:
+            if self._components.pop(component_id, None) is None:
+                continue
+
+            i = bisect.bisect_left(self._component_ids, component_id)
+            del self._component_ids[i]
+
+        for info in itertools.chain(delta.changed, delta.added):
+            component_id = common.get_component_id(info)
+            if component_id not in self._components:
+                bisect.insort(self._component_ids, component_id)
+
+            self._components[component_id] = info
+
+        await self._set_state(self._get_state())
+
+    def _get_state(self):
+        info = self._components.get((self._mid, self._cid))
+        return State(info=info,
+                     components=[self._components[i]
+                                 for i in self._component_ids],
+                     version=self._version)
+
+    async def _set_state(self, state):
         self._state = state
         if self._state_cb:
             await aio.call(self._state_cb, self, state)
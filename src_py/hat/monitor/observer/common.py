@@ -1,21 +1,266 @@
 from hat.monitor.common import *  # NOQA
 
-from hat import json
+from collections.abc import Iterable
+import asyncio
+import collections
+import enum
+import itertools
+import logging
+import typing
+
 from hat import sbs
 from hat.drivers import chatter
 
 from hat.monitor.common import (BlessingReq,
                                 BlessingRes,
+                                Cid,
                                 ComponentInfo,
+                                EncodedData,
+                                Mid,
                                 sbs_repo)
 
 
+mlog: logging.Logger = logging.getLogger(__name__)
+"""Module logger"""
+
+ComponentId: typing.TypeAlias = tuple[Mid, Cid]
+"""Component identifier"""
+
+GetIdCb: typing.TypeAlias = typing.Callable[[ComponentInfo], typing.Hashable]
+"""Get component identifier callback"""
+
+SnapshotCb: typing.TypeAlias = typing.Callable[[], chatter.Data]
+"""Snapshot message callback"""
+
+Session: typing.TypeAlias = str
+"""Client session token"""
+
+
+class OverflowPolicy(enum.Enum):
+    CLOSE = 'CLOSE'
+    RESYNC = 'RESYNC'
+
+
+class CacheInfo(typing.NamedTuple):
+    hits: int
+    misses: int
+    currsize: int
+
+
+class ComponentsDelta(typing.NamedTuple):
+    """Difference between two component collections
+
+    Removed components are represented by their identifiers.
+
+    """
+    added: list[ComponentInfo]
+    changed: list[ComponentInfo]
+    removed: list[typing.Hashable]
+
+
+class SendQueue:
+    """Connection's outbound message queue
+
+    Messages are enqueued without blocking and sent to connection by
+    separate task bound to connection's lifetime.
+
+    Snapshot message represents complete state and is created with
+    `snapshot_cb` immediately prior to its sending. Once snapshot is
+    requested, all previously enqueued messages and messages enqueued
+    before snapshot is created are discarded (they are already part of
+    the snapshot).
+
+    If number of enqueued messages reaches `queue_size`, new message is
+    handled according to `overflow_policy`:
+
+        * `OverflowPolicy.CLOSE` - connection is closed
+        * `OverflowPolicy.RESYNC` - snapshot is requested
+
+    If `conflate` is set, message enqueued while previous message is still
+    waiting to be sent causes snapshot request - at most one message and
+    one snapshot are retained for each connection.
+
+    Number of enqueued messages discarded in favor of snapshot is available
+    as `conflated_count`.
+
+    Control messages (messages which are not part of state, e.g. resync
+    requests) are enqueued with `send_control`. They are never discarded in
+    favor of snapshot and are sent prior to other enqueued messages.
+
+    """
+
+    def __init__(self,
+                 conn: chatter.Connection,
+                 snapshot_cb: SnapshotCb,
+                 queue_size: int = 1024,
+                 overflow_policy: OverflowPolicy = OverflowPolicy.RESYNC,
+                 conflate: bool = False):
+        self._conn = conn
+        self._snapshot_cb = snapshot_cb
+        self._queue_size = queue_size
+        self._overflow_policy = overflow_policy
+        self._conflate = conflate
+        self._conflated_count = 0
+        self._queue = collections.deque()
+        self._control_queue = collections.deque()
+        self._snapshot = False
+        self._event = asyncio.Event()
+
+        conn.async_group.spawn(self._send_loop)
+
+    @property
+    def conflated_count(self) -> int:
+        """Number of messages discarded in favor of snapshot"""
+        return self._conflated_count
+
+    def send(self, data: chatter.Data):
+        """Enqueue message"""
+        if self._snapshot:
+            self._conflated_count += 1
+            return
+
+        if self._conflate and self._queue:
+            self._conflated_count += 1
+            self.send_snapshot()
+            return
+
+        if self._is_full():
+            self._on_overflow()
+            return
+
+        self._queue.append(data)
+        self._event.set()
+
+    def send_control(self, data: chatter.Data):
+        """Enqueue control message"""
+        if self._is_full():
+            self._on_overflow()
+
+            if not self._conn.is_open:
+                return
+
+        self._control_queue.append(data)
+        self._event.set()
+
+    def send_snapshot(self):
+        """Discard enqueued messages and enqueue snapshot"""
+        self._conflated_count += len(self._queue)
+        self._queue.clear()
+        self._snapshot = True
+        self._event.set()
+
+    async def _send_loop(self):
+        try:
+            while True:
+                await self._event.wait()
+                self._event.clear()
+
+                while self._control_queue or self._snapshot or self._queue:
+                    if self._control_queue:
+                        data = self._control_queue.popleft()
+
+                    elif self._snapshot:
+                        self._snapshot = False
+                        data = self._snapshot_cb()
+
+                    else:
+                        data = self._queue.popleft()
+
+                    await self._conn.send(data)
+                    await self._conn.drain()
+
+        except ConnectionError:
+            pass
+
+        except Exception as e:
+            mlog.error('send loop error: %s', e, exc_info=e)
+
+        finally:
+            self._conn.close()
+
+    def _is_full(self):
+        return (len(self._queue) + len(self._control_queue) >=
+                self._queue_size)
+
+    def _on_overflow(self):
+        if self._overflow_policy == OverflowPolicy.CLOSE:
+            mlog.warning('send queue overflow - closing connection')
+            self._conn.close()
+
+        elif self._overflow_policy == OverflowPolicy.RESYNC:
+            mlog.warning('send queue overflow - sending snapshot')
+            self.send_snapshot()
+
+        else:
+            raise ValueError('unsupported overflow policy')
+
+
+class ComponentInfoSbsCache:
+    """Component info SBS data cache
+
+    For each component (identified with `get_id`, which defaults to
+    `get_component_id`), SBS data of the most recently converted component
+    info is retained. Cached SBS data is reused only if the same component
+    info instance is converted again - because of this, component infos and
+    resulting SBS data should not be modified.
+
+    Entries are not evicted automatically. Components which are no longer
+    available should be removed with `remove`, which bounds cache size to the
+    number of available components.
+
+    """
+
+    def __init__(self, get_id: GetIdCb | None = None):
+        self._get_id = get_id or get_component_id
+        self._entries = {}
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def cache_info(self) -> CacheInfo:
+        """Cache usage"""
+        return CacheInfo(hits=self._hits,
+                         misses=self._misses,
+                         currsize=len(self._entries))
+
+    def get(self, info: ComponentInfo) -> sbs.Data:
+        """Get component info SBS data"""
+        component_id = self._get_id(info)
+
+        entry = self._entries.get(component_id)
+        if entry and entry[0] is info:
+            self._hits += 1
+            return entry[1]
+
+        self._misses += 1
+        data = component_info_to_sbs(info)
+        self._entries[component_id] = info, data
+        return data
+
+    def remove(self, component_ids: Iterable[typing.Hashable]):
+        """Remove cached entries of components"""
+        for component_id in component_ids:
+            self._entries.pop(component_id, None)
+
+
+def encode_msg(msg_type: str,
+               msg_data: sbs.Data
+               ) -> chatter.Data:
+    """Encode Observer message
+
+    Encoded message can be sent to multiple connections with
+    `hat.drivers.chatter.Connection.send`.
+
+    """
+    msg = sbs_repo.encode(msg_type, msg_data)
+    return chatter.Data(msg_type, msg)
+
+
 async def send_msg(conn: chatter.Connection,
                    msg_type: str,
                    msg_data: sbs.Data):
     """Send Observer message"""
-    msg = sbs_repo.encode(msg_type, msg_data)
-    await conn.send(chatter.Data(msg_type, msg))
+    await conn.send(encode_msg(msg_type, msg_data))
 
 
 async def receive_msg(conn: chatter.Connection) -> tuple[str, sbs.Data]:
@@ -28,25 +273,50 @@ async def receive_msg(conn: chatter.Connection) -> tuple[str, sbs.Data]:
 def blessing_req_to_sbs(blessing: BlessingReq) -> sbs.Data:
     """Convert blessing request to SBS data"""
     return {'token': _value_to_sbs_optional(blessing.token),
-            'timestamp': _value_to_sbs_optional(blessing.timestamp)}
+            'timestamp': _value_to_sbs_optional(blessing.timestamp),
+            'standby': blessing.standby}
 
 
 def blessing_req_from_sbs(data: sbs.Data) -> BlessingReq:
     """Convert SBS data to blessing request"""
     return BlessingReq(token=_value_from_sbs_maybe(data['token']),
-                       timestamp=_value_from_sbs_maybe(data['timestamp']))
+                       timestamp=_value_from_sbs_maybe(data['timestamp']),
+                       standby=data['standby'])
 
 
 def blessing_res_to_sbs(res: BlessingRes) -> sbs.Data:
     """Convert blessing response to SBS data"""
     return {'token': _value_to_sbs_optional(res.token),
-            'ready': res.ready}
+            'ready': res.ready,
+            'standby': res.standby}
 
 
 def blessing_res_from_sbs(data: sbs.Data) -> BlessingRes:
     """Convert SBS data to blessing response"""
     return BlessingRes(token=_value_from_sbs_maybe(data['token']),
-                       ready=data['ready'])
+                       ready=data['ready'],
+                       standby=data['standby'])
+
+
+def subscription_to_sbs(subscription: Iterable[str] | None) -> sbs.Data:
+    """Convert subscription to SBS data"""
+    return _value_to_sbs_optional(list(subscription)
+                                  if subscription is not None else None)
+
+
+def subscription_from_sbs(data: sbs.Data) -> list[str] | None:
+    """Convert SBS data to subscription"""
+    return _value_from_sbs_maybe(data)
+
+
+def session_to_sbs(session: Session | None) -> sbs.Data:
+    """Convert session token to SBS data"""
+    return _value_to_sbs_optional(session)
+
+
+def session_from_sbs(data: sbs.Data) -> Session | None:
+    """Convert SBS data to session token"""
+    return _value_from_sbs_maybe(data)
 
 
 def component_info_to_sbs(info: ComponentInfo) -> sbs.Data:
@@ -55,7 +325,7 @@ def component_info_to_sbs(info: ComponentInfo) -> sbs.Data:
             'mid': info.mid,
             'name': _value_to_sbs_optional(info.name),
             'group': _value_to_sbs_optional(info.group),
-            'data': json.encode(info.data),
+            'data': info.encoded_data,
             'rank': info.rank,
             'blessingReq': blessing_req_to_sbs(info.blessing_req),
             'blessingRes': blessing_res_to_sbs(info.blessing_res)}
@@ -68,12 +338,95 @@ def component_info_from_sbs(data: sbs.Data) -> ComponentInfo:
         mid=data['mid'],
         name=_value_from_sbs_maybe(data['name']),
         group=_value_from_sbs_maybe(data['group']),
-        data=json.decode(data['data']),
+        data=EncodedData(data['data']),
         rank=data['rank'],
         blessing_req=blessing_req_from_sbs(data['blessingReq']),
         blessing_res=blessing_res_from_sbs(data['blessingRes']))
 
 
+def get_component_id(info: ComponentInfo) -> ComponentId:
+    """Get component identifier"""
+    return info.mid, info.cid
+
+
+def get_components_delta(old_components: dict[typing.Hashable, ComponentInfo],
+                         new_components: Iterable[ComponentInfo],
+                         get_id: GetIdCb = get_component_id
+                         ) -> tuple[dict[typing.Hashable, ComponentInfo],
+                                    ComponentsDelta]:
+    """Calculate difference between old and new components
+
+    Old components are provided as identifier to component info mapping
+    where identifiers are obtained with `get_id`. Result contains new
+    components mapping and calculated difference.
+
+    """
+    components = {}
+    added = []
+    changed = []
+
+    for info in new_components:
+        component_id = get_id(info)
+        components[component_id] = info
+
+        old_info = old_components.get(component_id)
+        if old_info is None:
+            added.append(info)
+
+        elif old_info is not info and old_info != info:
+            changed.append(info)
+
+    removed = [component_id for component_id in old_components.keys()
+               if component_id not in components]
+
+    return components, ComponentsDelta(added=added,
+                                       changed=changed,
+                                       removed=removed)
+
+
+def apply_components_delta(components: dict[ComponentId, ComponentInfo],
+                           delta: ComponentsDelta):
+    """Apply difference to component id to component info mapping
+
+    Mapping is modified in place.
+
+    """
+    for component_id in delta.removed:
+        components.pop(component_id, None)
+
+    for info in itertools.chain(delta.changed, delta.added):
+        components[get_component_id(info)] = info
+
+
+def is_components_delta_empty(delta: ComponentsDelta) -> bool:
+    """Check if difference is empty"""
+    return not (delta.added or delta.changed or delta.removed)
+
+
+def components_delta_to_sbs(delta: ComponentsDelta,
+                            cache: ComponentInfoSbsCache | None = None
+                            ) -> sbs.Data:
+    """Convert components difference to SBS data
+
+    If `cache` is provided, component infos are converted with
+    `ComponentInfoSbsCache.get`.
+
+    """
+    to_sbs = cache.get if cache else component_info_to_sbs
+    return {'added': [to_sbs(i) for i in delta.added],
+            'changed': [to_sbs(i) for i in delta.changed],
+            'removed': [{'mid': mid, 'cid': cid}
+                        for mid, cid in delta.removed]}
+
+
+def components_delta_from_sbs(data: sbs.Data) -> ComponentsDelta:
+    """Convert SBS data to components difference"""
+    return ComponentsDelta(
+        added=[component_info_from_sbs(i) for i in data['added']],
+        changed=[component_info_from_sbs(i) for i in data['changed']],
+        removed=[(i['mid'], i['cid']) for i in data['removed']])
+
+
 def _value_to_sbs_optional(value):
     return ('value', value) if value is not None else ('none', None)
 
@@ -1,7 +1,8 @@
 """Observer Master"""
 
 from collections.abc import Iterable
-import contextlib
+import asyncio
+import functools
 import itertools
 import logging
 import typing
@@ -29,6 +30,12 @@ BlessingCb: typing.TypeAlias = typing.Callable[
 
 async def listen(addr: tcp.Address,
                  *,
+                 update_delay: float | None = None,
+                 send_queue_size: int = 1024,
+                 overflow_policy: common.OverflowPolicy = common.OverflowPolicy.RESYNC,  # NOQA
+                 conflate: bool = False,
+                 accept_standby: bool = False,
+                 promote_timeout: float | None = 5,
                  global_components_cb: ComponentsCb | None = None,
                  blessing_cb: BlessingCb | None = None,
                  **kwargs
@@ -38,17 +45,55 @@ async def listen(addr: tcp.Address,
     All slave connections are always bound to server lifetime
     (`bind_connections` should not be set).
 
+    If `update_delay` is ``None``, global components (including blessing
+    calculation) are recalculated immediately on each change. Otherwise,
+    changes occurring during `update_delay` seconds after first change are
+    merged into single recalculation (``0`` postpones recalculation to next
+    event loop iteration).
+
+    Messages are sent to each slave independently with
+    `hat.monitor.observer.common.SendQueue` configured with `send_queue_size`,
+    `overflow_policy` and `conflate`.
+
+    If `accept_standby` is set, standby connections (connections initiated
+    with `HatObserver2.MsgStandby`) are held idle regardless of master's
+    activity. Once standby connection is promoted (by receiving
+    `HatObserver2.MsgSlave`) while master is not active, it is held until
+    master is activated or explicitly deactivated, for at most
+    `promote_timeout` seconds (``None`` disables timeout). If
+    `accept_standby` is not set, connections made while master is not active
+    are closed immediately.
+
     Additional arguments are passed directly to `hat.drivers.chatter.listen`.
 
     """
     master = Master()
+    master._update_delay = update_delay
+    master._send_queue_size = send_queue_size
+    master._overflow_policy = overflow_policy
+    master._conflate = conflate
+    master._accept_standby = accept_standby
+    master._promote_timeout = promote_timeout
     master._global_components_cb = global_components_cb
     master._blessing_cb = blessing_cb
+    master._pending_updates = 0
+    master._merged_updates = 0
     master._mid_conns = {}
+    master._mid_send_queues = {}
     master._mid_cid_infos = {0: {}}
+    master._mid_cid_sources = {}
+    master._local_components = None
+    master._mid_seqs = {}
+    master._components_version = 0
     master._global_components = []
+    master._global_components_version = 0
+    master._sent_global_components = master._global_components
+    master._sent_components = {}
+    master._sent_version = 0
+    master._sbs_cache = common.ComponentInfoSbsCache()
     master._next_mids = itertools.count(1)
     master._active_subgroup = None
+    master._promoted_conns = {}
 
     master._srv = await chatter.listen(master._on_connection, addr,
                                        bind_connections=True,
@@ -77,15 +122,55 @@ class Master(aio.Resource):
     def is_active(self) -> bool:
         return self._active_subgroup is not None
 
+    @property
+    def merged_updates(self) -> int:
+        """Number of changes merged into other global components updates"""
+        return self._merged_updates
+
+    @property
+    def conflated_counts(self) -> dict[common.Mid, int]:
+        """Number of conflated messages for each connected slave"""
+        return {mid: send_queue.conflated_count
+                for mid, send_queue in self._mid_send_queues.items()}
+
+    @property
+    def sbs_cache_info(self) -> common.CacheInfo:
+        """Component info SBS data cache usage"""
+        return self._sbs_cache.cache_info
+
     def set_active(self, active: bool):
         if active and not self._active_subgroup:
             self._active_subgroup = self.async_group.create_subgroup()
 
-        elif not active and self._active_subgroup:
-            self._active_subgroup.close()
-            self._active_subgroup = None
+            promoted_conns, self._promoted_conns = self._promoted_conns, {}
+            for conn, (msg, timer) in promoted_conns.items():
+                if timer:
+                    timer.cancel()
+                self._active_subgroup.spawn(self._slave_loop, conn, msg)
+
+        elif not active:
+            if self._active_subgroup:
+                self._active_subgroup.close()
+                self._active_subgroup = None
+
+            promoted_conns, self._promoted_conns = self._promoted_conns, {}
+            for conn, (_, timer) in promoted_conns.items():
+                if timer:
+                    timer.cancel()
+                conn.close()
 
     async def set_local_components(self, local_components: Iterable[common.ComponentInfo]):  # NOQA
+        """Set local components
+
+        Local components collection and its component infos should not be
+        modified after call. Unchanged local components are detected based
+        on collection and component info identity.
+
+        """
+        if local_components is self._local_components:
+            return
+
+        self._local_components = local_components
         await self._update_components(0, local_components)
 
     async def set_local_blessing_reqs(self, blessing_reqs: Iterable[tuple[common.Cid, common.BlessingReq]]):  # NOQA
@@ -103,36 +188,129 @@ class Master(aio.Resource):
         if change:
             await self._update_global_components()
 
+    async def calculate_blessing(self):
+        """Recalculate blessing
+
+        Blessing is recalculated even if components are not changed (e.g.
+        when result of blessing callback depends on time).
+
+        """
+        await self._calculate()
+
     def _on_connection(self, conn):
         try:
-            self._active_subgroup.spawn(self._slave_loop, conn)
+            if self._accept_standby:
+                self.async_group.spawn(self._connection_loop, conn)
+
+            else:
+                self._active_subgroup.spawn(self._slave_loop, conn)
 
         except Exception:
             conn.close()
 
-    async def _slave_loop(self, conn):
+    async def _connection_loop(self, conn):
+        try:
+            msg = await common.receive_msg(conn)
+
+            if msg[0] == 'HatObserver2.MsgStandby':
+                mlog.debug('holding standby connection')
+                msg = await common.receive_msg(conn)
+
+                if (msg[0] == 'HatObserver2.MsgSlave' and
+                        not self._active_subgroup):
+                    mlog.debug('holding promoted connection until activation')
+                    timer = None
+                    if self._promote_timeout is not None:
+                        timer = asyncio.get_running_loop().call_later(
+                            self._promote_timeout, self._on_promote_timeout,
+                            conn)
+
+                    self._promoted_conns[conn] = msg, timer
+                    return
+
+            if not self._active_subgroup:
+                conn.close()
+                return
+
+            self._active_subgroup.spawn(self._slave_loop, conn, msg)
+
+        except ConnectionError:
+            pass
+
+        except Exception as e:
+            mlog.error('connection loop error: %s', e, exc_info=e)
+            conn.close()
+
+    def _on_promote_timeout(self, conn):
+        if self._promoted_conns.pop(conn, None) is None:
+            return
+
+        mlog.debug('promoted connection not activated - closing connection')
+        conn.close()
+
+    async def _slave_loop(self, conn, msg=None):
         mid = next(self._next_mids)
 
         mlog.debug('starting slave loop (mid: %s)', mid)
         try:
             while True:
-                msg_type, msg_data = await common.receive_msg(conn)
-
-                if msg_type != 'HatObserver.MsgSlave':
+                if msg:
+                    msg_type, msg_data = msg
+                    msg = None
+
+                else:
+                    msg_type, msg_data = await common.receive_msg(conn)
+
+                if msg_type == 'HatObserver2.MsgSlave':
+                    mlog.debug('received msg slave (mid: %s)', mid)
+                    self._mid_seqs[mid] = msg_data['seq']
+                    components = (common.component_info_from_sbs(i)
+                                  for i in msg_data['components'])
+                    await self._update_components(mid, components)
+
+                    if mid not in self._mid_conns:
+                        self._mid_conns[mid] = conn
+                        self._mid_send_queues[mid] = common.SendQueue(
+                            conn=conn,
+                            snapshot_cb=functools.partial(
+                                self._get_msg_master, mid),
+                            queue_size=self._send_queue_size,
+                            overflow_policy=self._overflow_policy,
+                            conflate=self._conflate)
+                        self._mid_send_queues[mid].send_snapshot()
+
+                elif msg_type == 'HatObserver2.MsgSlaveDelta':
+                    mlog.debug('received msg slave delta (mid: %s)', mid)
+                    seq = self._mid_seqs.get(mid)
+                    if seq is None:
+                        continue
+
+                    if msg_data['seq'] != seq + 1:
+                        mlog.warning('detected sequence gap (mid: %s) - '
+                                     'requesting resync', mid)
+                        self._mid_seqs[mid] = None
+                        self._mid_send_queues[mid].send_control(
+                            common.encode_msg('HatObserver2.MsgResync', None))
+                        continue
+
+                    self._mid_seqs[mid] = msg_data['seq']
+                    delta = common.ComponentsDelta(
+                        added=[common.component_info_from_sbs(i)
+                               for i in msg_data['added']],
+                        changed=[common.component_info_from_sbs(i)
+                                 for i in msg_data['changed']],
+                        removed=msg_data['removed'])
+                    await self._update_components_delta(mid, delta)
+
+                elif msg_type == 'HatObserver2.MsgResync':
+                    mlog.debug('received msg resync (mid: %s)', mid)
+                    send_queue = self._mid_send_queues.get(mid)
+                    if send_queue:
+                        send_queue.send_snapshot()
+
+                else:
                     raise Exception('unsupported message type')
 
-                mlog.debug('received msg slave (mid: %s)', mid)
-                components = (common.component_info_from_sbs(i)
-                              for i in msg_data['components'])
-                await self._update_components(mid, components)
-
-                if mid not in self._mid_conns:
-                    self._mid_conns[mid] = conn
-
-                    global_components = list(
-                        _flatten_mid_cid_infos(self._mid_cid_infos))
-                    await _send_msg_master(conn, mid, global_components)
-
         except ConnectionError:
             pass
 
@@ -146,6 +324,9 @@ class Master(aio.Resource):
 
     async def _remove_slave(self, mid):
         self._mid_conns.pop(mid, None)
+        self._mid_send_queues.pop(mid, None)
+        self._mid_seqs.pop(mid, None)
+        self._mid_cid_sources.pop(mid, None)
 
         if not self._mid_cid_infos.pop(mid, None):
             return
@@ -153,15 +334,31 @@ class Master(aio.Resource):
         await self._update_global_components()
 
     async def _update_components(self, mid, components):
+        # component info provided as same instance as in previous update is
+        # unchanged and its content is not compared - this applies to local
+        # components, while components received from slave are decoded
+        # from each MsgSlave (full state is received only on slave's
+        # connection and resync, other changes are received as deltas)
         cid_infos = self._mid_cid_infos.get(mid, {})
+        cid_sources = self._mid_cid_sources.get(mid, {})
 
         self._mid_cid_infos[mid] = {}
-        for info in components:
-            info = info._replace(mid=mid)
+        self._mid_cid_sources[mid] = {}
+        for source in components:
+            self._mid_cid_sources[mid][source.cid] = source
+            old_info = cid_infos.get(source.cid)
 
-            old_info = cid_infos.get(info.cid)
-            if old_info:
-                info = info._replace(blessing_req=old_info.blessing_req)
+            if old_info and cid_sources.get(source.cid) is source:
+                info = old_info
+
+            else:
+                info = source._replace(mid=mid)
+
+                if old_info:
+                    info = info._replace(blessing_req=old_info.blessing_req)
+
+                    if info == old_info:
+                        info = old_info
 
             self._mid_cid_infos[mid][info.cid] = info
 
@@ -170,34 +367,119 @@ class Master(aio.Resource):
 
         await self._update_global_components()
 
+    async def _update_components_delta(self, mid, delta):
+        cid_infos = self._mid_cid_infos[mid]
+        cid_sources = self._mid_cid_sources.get(mid, {})
+        change = False
+
+        for cid in delta.removed:
+            cid_sources.pop(cid, None)
+            if cid_infos.pop(cid, None):
+                change = True
+
+        for info in itertools.chain(delta.changed, delta.added):
+            cid_sources.pop(info.cid, None)
+            info = info._replace(mid=mid)
+
+            old_info = cid_infos.get(info.cid)
+            if old_info:
+                info = info._replace(blessing_req=old_info.blessing_req)
+
+                if info == old_info:
+                    continue
+
+            cid_infos[info.cid] = info
+            change = True
+
+        if change:
+            await self._update_global_components()
+
     async def _update_global_components(self):
+        self._components_version += 1
+        await self._calculate()
+
+    async def _calculate(self):
+        if self._update_delay is None:
+            await self._calculate_global_components()
+            return
+
+        self._pending_updates += 1
+        if self._pending_updates > 1 or not self.is_open:
+            return
+
+        self.async_group.spawn(self._delayed_update_global_components)
+
+    async def _delayed_update_global_components(self):
+        await asyncio.sleep(self._update_delay)
+
+        mlog.debug('updating global components (merged changes: %s)',
+                   self._pending_updates - 1)
+        self._merged_updates += self._pending_updates - 1
+        self._pending_updates = 0
+
+        try:
+            await self._calculate_global_components()
+
+        except Exception as e:
+            mlog.error('update global components error: %s', e, exc_info=e)
+
+    async def _calculate_global_components(self):
         if self._blessing_cb:
             infos = _flatten_mid_cid_infos(self._mid_cid_infos)
 
             for mid, cid, blessing_req in self._blessing_cb(self, infos):
                 info = self._mid_cid_infos[mid][cid]
+                if info.blessing_req == blessing_req:
+                    continue
+
                 info = info._replace(blessing_req=blessing_req)
                 self._mid_cid_infos[mid][cid] = info
+                self._components_version += 1
 
-        global_components = list(_flatten_mid_cid_infos(self._mid_cid_infos))
-        if global_components == self._global_components:
+        if self._components_version == self._global_components_version:
             return
 
+        global_components = list(_flatten_mid_cid_infos(self._mid_cid_infos))
         self._global_components = global_components
+        self._global_components_version = self._components_version
 
         if self._global_components_cb:
             await aio.call(self._global_components_cb, self, global_components)
 
-        for mid, conn in list(self._mid_conns.items()):
-            with contextlib.suppress(ConnectionError):
-                await _send_msg_master(conn, mid, global_components)
+        self._send_msg_master_delta()
+
+    def _send_msg_master_delta(self):
+        if self._global_components is self._sent_global_components:
+            return
+
+        components, delta = common.get_components_delta(
+            self._sent_components, self._global_components)
+
+        self._sent_global_components = self._global_components
+        self._sent_components = components
+        self._sbs_cache.remove(delta.removed)
+
+        if common.is_components_delta_empty(delta):
+            return
+
+        self._sent_version += 1
+
+        if not self._mid_send_queues:
+            return
+
+        data = common.encode_msg('HatObserver2.MsgMasterDelta', {
+            'version': self._sent_version,
+            'delta': common.components_delta_to_sbs(delta, self._sbs_cache)})
 
+        for send_queue in self._mid_send_queues.values():
+            send_queue.send(data)
 
-async def _send_msg_master(conn, mid, global_components):
-    components = [common.component_info_to_sbs(i) for i in global_components]
-    await common.send_msg(conn, 'HatObserver.MsgMaster', {
-        'mid': mid,
-        'components': components})
+    def _get_msg_master(self, mid):
+        return common.encode_msg('HatObserver2.MsgMaster', {
+            'mid': mid,
+            'version': self._sent_version,
+            'components': [self._sbs_cache.get(i)
+                           for i in self._sent_components.values()]})
 
 
 def _flatten_mid_cid_infos(mid_cid_infos):
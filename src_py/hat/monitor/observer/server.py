@@ -1,13 +1,14 @@
 """Observer Server"""
 
+import asyncio
+import collections
 import contextlib
 import itertools
 import logging
+import secrets
 import typing
 
 from hat import aio
-from hat import json
-from hat import util
 from hat.drivers import chatter
 from hat.drivers import tcp
 
@@ -22,15 +23,26 @@ StateCb: typing.TypeAlias = aio.AsyncCallable[['Server', 'State'], None]
 
 
 class State(typing.NamedTuple):
+    """Server state
+
+    Version is incremented on each state change.
+
+    """
     mid: int
     local_components: list[common.ComponentInfo]
     global_components: list[common.ComponentInfo]
+    version: int = 0
 
 
 async def listen(addr: tcp.Address,
                  *,
                  default_rank: int = 1,
                  close_timeout: float = 3,
+                 broadcast_delay: float | None = None,
+                 send_queue_size: int = 1024,
+                 overflow_policy: common.OverflowPolicy = common.OverflowPolicy.RESYNC,  # NOQA
+                 conflate: bool = False,
+                 session_timeout: float | None = None,
                  state_cb: StateCb | None = None,
                  **kwargs
                  ) -> 'Server':
@@ -39,19 +51,60 @@ async def listen(addr: tcp.Address,
     All client connections are always bound to server lifetime regardles
     of `bind_connections` argument.
 
+    If `broadcast_delay` is ``None``, each state change is immediately
+    sent to clients and notified with `state_cb`. Otherwise, state changes
+    occurring during `broadcast_delay` seconds after first unsent change are
+    merged into single state broadcast and single `state_cb` call.
+
+    Each client receives only global components matching its subscription
+    (see `hat.monitor.observer.client.connect`). Messages for clients with
+    same subscription are encoded only once.
+
+    Messages are sent to each client independently with
+    `hat.monitor.observer.common.SendQueue` configured with `send_queue_size`,
+    `overflow_policy` and `conflate`.
+
+    If `session_timeout` is not ``None``, each client is assigned session
+    token. Once identified client disconnects, its component is retained
+    (without change) for `session_timeout` seconds. Client reconnecting
+    with its session token during this period takes over retained
+    component (see `hat.monitor.observer.client.connect`). Client can also
+    take over component of still connected client with same session token
+    (previous connection is closed).
+
     Additional arguments are passed directly to `hat.drivers.chatter.listen`.
 
     """
     server = Server()
     server._default_rank = default_rank
     server._close_timeout = close_timeout
+    server._broadcast_delay = broadcast_delay
+    server._send_queue_size = send_queue_size
+    server._overflow_policy = overflow_policy
+    server._conflate = conflate
+    server._session_timeout = session_timeout
     server._state_cb = state_cb
-    server._state = State(mid=0,
-                          local_components=[],
-                          global_components=[])
+    server._pending_changes = 0
+    server._merged_changes = 0
+    server._mid = 0
+    server._local_components = {}
+    server._global_components = []
+    server._version = 0
+    server._state = None
     server._next_cids = itertools.count(1)
     server._cid_conns = {}
+    server._cid_send_queues = {}
+    server._cid_subscription_keys = {}
+    server._cid_sessions = {}
+    server._session_cids = {}
+    server._session_timeout_tasks = {}
     server._rank_cache = {}
+    server._sent_version = 0
+    server._sent_mid = 0
+    server._sent_global_components = server._global_components
+    server._sent_components = {}
+    server._sent_subscription_components = {}
+    server._sbs_cache = common.ComponentInfoSbsCache()
 
     server._srv = await chatter.listen(server._client_loop, addr, **kwargs)
 
@@ -73,71 +126,127 @@ class Server(aio.Resource):
     @property
     def state(self) -> State:
         """Server's state"""
+        if self._state is None:
+            self._state = State(
+                mid=self._mid,
+                local_components=list(self._local_components.values()),
+                global_components=self._global_components,
+                version=self._version)
+
         return self._state
 
+    @property
+    def merged_changes(self) -> int:
+        """Number of state changes merged into other state broadcasts"""
+        return self._merged_changes
+
+    @property
+    def conflated_counts(self) -> dict[common.Cid, int]:
+        """Number of conflated messages for each connected client"""
+        return {cid: send_queue.conflated_count
+                for cid, send_queue in self._cid_send_queues.items()}
+
+    @property
+    def sbs_cache_info(self) -> common.CacheInfo:
+        """Component info SBS data cache usage"""
+        return self._sbs_cache.cache_info
+
     async def update(self,
                      mid: int,
                      global_components: list[common.ComponentInfo]):
-        """Update server's monitor id and global components"""
-        if (mid == self._state.mid and
-                global_components == self._state.global_components):
+        """Update server's monitor id and global components
+
+        Global components list should not be modified after update. Change
+        of global components is detected based on list identity.
+
+        """
+        if (mid == self._mid and
+                global_components is self._global_components):
             return
 
-        blessing_reqs = {i.cid: i.blessing_req
-                         for i in global_components
-                         if i.mid == mid}
+        if mid != self._mid:
+            self._mid = mid
+            self._local_components = {
+                cid: info._replace(mid=mid)
+                for cid, info in self._local_components.items()}
+
+        for info in global_components:
+            if info.mid != mid:
+                continue
+
+            local_info = self._local_components.get(info.cid)
+            if not local_info or local_info.blessing_req == info.blessing_req:
+                continue
+
+            self._local_components[info.cid] = local_info._replace(
+                blessing_req=info.blessing_req)
 
-        local_components = [
-            i._replace(mid=mid,
-                       blessing_req=blessing_reqs.get(i.cid, i.blessing_req))
-            for i in self._state.local_components]
+        self._global_components = global_components
 
-        await self._change_state(mid=mid,
-                                 local_components=local_components,
-                                 global_components=global_components)
+        await self._change_state()
 
     async def set_rank(self,
                        cid: int,
                        rank: int):
         """Set component rank"""
-        info = util.first(self._state.local_components,
-                          lambda i: i.cid == cid)
+        info = self._local_components.get(cid)
         if not info or info.rank == rank:
             return
 
         if info.name is not None:
             self._rank_cache[info.name, info.group] = rank
 
-        updated_info = info._replace(rank=rank)
-        local_components = [(updated_info if i is info else i)
-                            for i in self._state.local_components]
+        self._local_components[cid] = info._replace(rank=rank)
 
-        await self._change_state(local_components=local_components)
+        await self._change_state()
 
     async def _client_loop(self, conn):
         cid = next(self._next_cids)
         self._cid_conns[cid] = conn
+        # cid is changed if client resumes session
+        self._cid_send_queues[cid] = common.SendQueue(
+            conn=conn,
+            snapshot_cb=lambda: self._get_msg_server(cid),
+            queue_size=self._send_queue_size,
+            overflow_policy=self._overflow_policy,
+            conflate=self._conflate)
+        self._cid_send_queues[cid].send_snapshot()
+        self._cid_subscription_keys[cid] = None
+
+        if self._session_timeout is not None:
+            session = secrets.token_hex(16)
+            self._cid_sessions[cid] = session
+            self._session_cids[session] = cid
 
         mlog.debug('starting client loop (cid: %s)', cid)
         try:
-            local_components = [*self._state.local_components,
-                                self._get_init_info(cid)]
-            await self._change_state(local_components=local_components)
+            self._local_components[cid] = self._get_init_info(cid)
+            await self._change_state()
 
+            identified = False
             while True:
                 msg_type, msg_data = await common.receive_msg(conn)
 
-                if msg_type != 'HatObserver.MsgClient':
+                if msg_type != 'HatObserver2.MsgClient':
                     raise Exception('unsupported message type')
 
                 mlog.debug('received msg client (cid: %s)', cid)
+
+                if not identified:
+                    identified = True
+                    session = common.session_from_sbs(msg_data['session'])
+                    if session is not None:
+                        cid = await self._resume_session(cid, conn, session)
+
                 await self._update_client(
                     cid=cid,
                     name=msg_data['name'],
                     group=msg_data['group'],
-                    data=json.decode(msg_data['data']),
+                    data=common.EncodedData(msg_data['data']),
                     blessing_res=common.blessing_res_from_sbs(
-                        msg_data['blessingRes']))
+                        msg_data['blessingRes']),
+                    subscription=common.subscription_from_sbs(
+                        msg_data['subscription']))
 
         except ConnectionError:
             pass
@@ -147,42 +256,232 @@ class Server(aio.Resource):
 
         finally:
             mlog.debug('closing client loop (cid: %s)', cid)
-            await aio.uncancellable(self._remove_client(cid))
+            await aio.uncancellable(self._remove_client(cid, conn))
 
-    async def _change_state(self, **kwargs):
-        self._state = self._state._replace(**kwargs)
+    async def _change_state(self):
+        self._version += 1
+        self._state = None
 
-        for cid, conn in list(self._cid_conns.items()):
-            with contextlib.suppress(ConnectionError):
-                await common.send_msg(conn, 'HatObserver.MsgServer', {
-                    'cid': cid,
-                    'mid': self._state.mid,
-                    'components': [common.component_info_to_sbs(info)
-                                   for info in self._state.global_components]})
+        if self._broadcast_delay is None:
+            await self._broadcast()
+            return
 
-        if self._state_cb:
-            await aio.call(self._state_cb, self, self._state)
+        self._pending_changes += 1
+        if self._pending_changes > 1 or not self.is_open:
+            return
 
-    async def _remove_client(self, cid):
-        conn = self._cid_conns.pop(cid)
+        self.async_group.spawn(self._delayed_broadcast)
+
+    async def _delayed_broadcast(self):
+        await asyncio.sleep(self._broadcast_delay)
+
+        self._merged_changes += self._pending_changes - 1
+        self._pending_changes = 0
 
         try:
-            local_components = [i for i in self._state.local_components
-                                if i.cid != cid]
-            await self._change_state(local_components=local_components)
+            await self._broadcast()
 
         except Exception as e:
-            mlog.error('change state error: %s', e, exc_info=e)
+            mlog.error('broadcast error: %s', e, exc_info=e)
+
+    async def _broadcast(self):
+        self._send_msg_server_delta()
+
+        if self._state_cb:
+            await aio.call(self._state_cb, self, self.state)
+
+    def _send_msg_server_delta(self):
+        if (self._mid == self._sent_mid and
+                self._global_components is self._sent_global_components):
+            return
+
+        # global components are provided as complete list, so they are
+        # compared (by identity for unchanged component infos) once per
+        # broadcast - subscription views are updated from resulting
+        # difference
+        old_mid = self._sent_mid
+        old_components = self._sent_components
+        components, delta = common.get_components_delta(
+            old_components, self._global_components)
+
+        self._sent_global_components = self._global_components
+        self._sent_components = components
+        self._sbs_cache.remove(delta.removed)
+
+        mid_changed = self._mid != old_mid
+        if not mid_changed and common.is_components_delta_empty(delta):
+            return
+
+        self._sent_mid = self._mid
+        self._sent_version += 1
+
+        key_send_queues = collections.defaultdict(list)
+        for cid, send_queue in self._cid_send_queues.items():
+            key = self._cid_subscription_keys[cid]
+            key_send_queues[key].append(send_queue)
+
+        subscription_components = {}
+        for key, send_queues in key_send_queues.items():
+            if key is None:
+                key_delta = delta
+
+            else:
+                key_components = self._sent_subscription_components.get(key)
+                if key_components is None or mid_changed:
+                    if key_components is None:
+                        key_components = {
+                            common.get_component_id(i): i
+                            for i in _filter_components(
+                                old_components.values(), old_mid, key)}
+
+                    key_components, key_delta = common.get_components_delta(
+                        key_components,
+                        _filter_components(self._global_components,
+                                           self._sent_mid, key))
+
+                else:
+                    key_delta = _apply_subscription_delta(
+                        key_components, delta, self._sent_mid, key)
+
+                subscription_components[key] = key_components
+
+                if (not mid_changed and
+                        common.is_components_delta_empty(key_delta)):
+                    continue
+
+            data = common.encode_msg('HatObserver2.MsgServerDelta', {
+                'mid': self._sent_mid,
+                'version': self._sent_version,
+                'delta': common.components_delta_to_sbs(key_delta,
+                                                        self._sbs_cache)})
+
+            for send_queue in send_queues:
+                send_queue.send(data)
+
+        self._sent_subscription_components = subscription_components
+
+    def _get_msg_server(self, cid):
+        key = self._cid_subscription_keys.get(cid)
+
+        if key is None:
+            components = self._sent_components.values()
+
+        elif key in self._sent_subscription_components:
+            components = self._sent_subscription_components[key].values()
+
+        else:
+            components = _filter_components(self._sent_components.values(),
+                                            self._sent_mid, key)
+
+        return common.encode_msg('HatObserver2.MsgServer', {
+            'cid': cid,
+            'mid': self._sent_mid,
+            'version': self._sent_version,
+            'components': [self._sbs_cache.get(info)
+                           for info in components],
+            'session': common.session_to_sbs(self._cid_sessions.get(cid))})
+
+    def _set_subscription(self, cid, group, subscription):
+        if subscription is None:
+            key = None
+
+        else:
+            groups = frozenset(subscription)
+            key = _SubscriptionKey(groups=groups,
+                                   cid=(cid if group not in groups else None))
+
+        if key == self._cid_subscription_keys.get(cid):
+            return
+
+        self._cid_subscription_keys[cid] = key
+        self._cid_send_queues[cid].send_snapshot()
+
+    async def _resume_session(self, cid, conn, session):
+        resumed_cid = self._session_cids.get(session)
+        if (resumed_cid is None or
+                resumed_cid == cid or
+                resumed_cid not in self._local_components):
+            return cid
+
+        mlog.debug('resuming session (cid: %s -> %s)', cid, resumed_cid)
+
+        task = self._session_timeout_tasks.pop(resumed_cid, None)
+        if task:
+            task.cancel()
+
+        resumed_conn = self._cid_conns.get(resumed_cid)
+
+        self._cid_conns[resumed_cid] = self._cid_conns.pop(cid)
+        self._cid_send_queues[resumed_cid] = self._cid_send_queues.pop(cid)
+        self._cid_subscription_keys[resumed_cid] = \
+            self._cid_subscription_keys.pop(cid)
+        self._session_cids.pop(self._cid_sessions.pop(cid), None)
+        self._local_components.pop(cid)
+
+        self._cid_send_queues[resumed_cid].send_snapshot()
+
+        if resumed_conn:
+            resumed_conn.close()
+
+        await self._change_state()
+
+        return resumed_cid
+
+    async def _remove_client(self, cid, conn):
+        if self._cid_conns.get(cid) is not conn:
+            await conn.async_close()
+            return
+
+        self._cid_conns.pop(cid)
+        self._cid_send_queues.pop(cid)
+        self._cid_subscription_keys.pop(cid)
+
+        info = self._local_components.get(cid)
+        if (cid in self._cid_sessions and
+                info and
+                info.name is not None and
+                self.is_open):
+            mlog.debug('retaining session (cid: %s)', cid)
+            self._session_timeout_tasks[cid] = self.async_group.spawn(
+                self._session_timeout_loop, cid)
+
+        else:
+            try:
+                await self._remove_component(cid)
+
+            except Exception as e:
+                mlog.error('change state error: %s', e, exc_info=e)
 
         with contextlib.suppress(Exception):
-            await conn.send(chatter.Data('HatObserver.MsgClose', b''))
+            await conn.send(chatter.Data('HatObserver2.MsgClose', b''))
             await aio.wait_for(conn.wait_closed(), self._close_timeout)
 
         await conn.async_close()
 
-    async def _update_client(self, cid, name, group, data, blessing_res):
-        info = util.first(self._state.local_components,
-                          lambda i: i.cid == cid)
+    async def _session_timeout_loop(self, cid):
+        await asyncio.sleep(self._session_timeout)
+
+        mlog.debug('session expired (cid: %s)', cid)
+        self._session_timeout_tasks.pop(cid, None)
+
+        try:
+            await self._remove_component(cid)
+
+        except Exception as e:
+            mlog.error('change state error: %s', e, exc_info=e)
+
+    async def _remove_component(self, cid):
+        session = self._cid_sessions.pop(cid, None)
+        self._session_cids.pop(session, None)
+
+        self._local_components.pop(cid, None)
+        await self._change_state()
+
+    async def _update_client(self, cid, name, group, data, blessing_res,
+                             subscription):
+        self._set_subscription(cid, group, subscription)
+
+        info = self._local_components[cid]
         updated_info = info._replace(name=name,
                                      group=group,
                                      data=data,
@@ -196,14 +495,13 @@ class Server(aio.Resource):
         if info == updated_info:
             return
 
-        local_components = [(updated_info if i is info else i)
-                            for i in self._state.local_components]
-        await self._change_state(local_components=local_components)
+        self._local_components[cid] = updated_info
+        await self._change_state()
 
     def _get_init_info(self, cid):
         return common.ComponentInfo(
             cid=cid,
-            mid=self._state.mid,
+            mid=self._mid,
             name=None,
             group=None,
             data=None,
@@ -212,3 +510,45 @@ class Server(aio.Resource):
                                             timestamp=None),
             blessing_res=common.BlessingRes(token=None,
                                             ready=False))
+
+
+class _SubscriptionKey(typing.NamedTuple):
+    groups: frozenset[str]
+    cid: common.Cid | None
+
+
+def _filter_components(components, mid, key):
+    for info in components:
+        if _is_subscribed(info, mid, key):
+            yield info
+
+
+def _is_subscribed(info, mid, key):
+    return info.group in key.groups or (info.mid == mid and
+                                        info.cid == key.cid)
+
+
+def _apply_subscription_delta(key_components, delta, mid, key):
+    added = []
+    changed = []
+    removed = []
+
+    for component_id in delta.removed:
+        if key_components.pop(component_id, None) is not None:
+            removed.append(component_id)
+
+    for info in itertools.chain(delta.changed, delta.added):
+        component_id = common.get_component_id(info)
+        is_included = component_id in key_components
+
+        if _is_subscribed(info, mid, key):
+            key_components[component_id] = info
+            (changed if is_included else added).append(info)
+
+        elif is_included:
+            del key_components[component_id]
+            removed.append(component_id)
+
+    return common.ComponentsDelta(added=added,
+                                  changed=changed,
+                                  removed=removed)
@@ -1,5 +1,7 @@
 """Observer Slave"""
 
+import asyncio
+import itertools
 import logging
 import typing
 
@@ -18,18 +20,29 @@ StateCb: typing.TypeAlias = aio.AsyncCallable[['Slave', 'State'], None]
 
 
 class State(typing.NamedTuple):
+    """Slave state
+
+    Version is global components version received from master.
+
+    """
     mid: int | None
     global_components: list[common.ComponentInfo]
+    version: int | None = None
 
 
 async def connect(addr: tcp.Address,
                   *,
                   local_components: list[common.ComponentInfo] = [],
+                  standby: bool = False,
                   state_cb: StateCb | None = None,
                   **kwargs
                   ) -> 'Slave':
     """Connect to Observer Master
 
+    If `standby` is set, connection is established as idle standby
+    connection - local components are not sent to master until connection
+    is promoted (see `Slave.promote`).
+
     Additional arguments are passed directly to `hat.drivers.chatter.connect`.
 
     """
@@ -38,6 +51,7 @@ async def connect(addr: tcp.Address,
     try:
         return Slave(conn=conn,
                      local_components=local_components,
+                     standby=standby,
                      state_cb=state_cb)
 
     except Exception:
@@ -55,12 +69,20 @@ class Slave(aio.Resource):
     def __init__(self,
                  conn: chatter.Connection,
                  local_components: list[common.ComponentInfo],
+                 standby: bool,
                  state_cb: StateCb | None):
         self._conn = conn
         self._local_components = local_components
+        self._standby = standby
         self._state_cb = state_cb
+        self._send_lock = asyncio.Lock()
+        self._next_seqs = itertools.count(1)
+        self._sent_local_components = {}
+        self._sbs_cache = common.ComponentInfoSbsCache(lambda i: i.cid)
         self._state = State(mid=None,
                             global_components=[])
+        self._version = None
+        self._components = {}
 
         self.async_group.spawn(self._slave_loop)
 
@@ -74,34 +96,79 @@ class Slave(aio.Resource):
         """Slave's state"""
         return self._state
 
+    @property
+    def is_standby(self) -> bool:
+        """Is connection idle standby connection"""
+        return self._standby
+
     async def update(self, local_components: list[common.ComponentInfo]):
-        """Update slaves's local components"""
-        if self._local_components == local_components:
-            return
+        """Update slaves's local components
 
+        While connection is standby connection, local components are only
+        stored and sent once connection is promoted.
+
+        """
         self._local_components = local_components
-        await self._send_msg_slave(local_components)
+
+        async with self._send_lock:
+            if self._standby:
+                return
+
+            await self._send_msg_slave_delta()
+
+    async def promote(self):
+        """Promote standby connection
+
+        Local components are sent to master, after which connection is
+        used as regular slave connection.
+
+        """
+        async with self._send_lock:
+            if not self._standby:
+                return
+
+            self._standby = False
+            await self._send_msg_slave()
 
     async def _slave_loop(self):
         mlog.debug('starting slave loop')
         try:
-            await self._send_msg_slave(self._local_components)
+            async with self._send_lock:
+                if self._standby:
+                    await common.send_msg(self._conn,
+                                          'HatObserver2.MsgStandby', None)
+
+                else:
+                    await self._send_msg_slave()
 
             while True:
                 msg_type, msg_data = await common.receive_msg(self._conn)
 
-                if msg_type != 'HatObserver.MsgMaster':
+                if msg_type == 'HatObserver2.MsgMaster':
+                    mlog.debug('received msg master')
+                    components = [common.component_info_from_sbs(i)
+                                  for i in msg_data['components']]
+                    await self._process_msg_master(
+                        mid=msg_data['mid'],
+                        version=msg_data['version'],
+                        components=components)
+
+                elif msg_type == 'HatObserver2.MsgMasterDelta':
+                    mlog.debug('received msg master delta')
+                    delta = common.components_delta_from_sbs(
+                        msg_data['delta'])
+                    await self._process_msg_master_delta(
+                        version=msg_data['version'],
+                        delta=delta)
+
+                elif msg_type == 'HatObserver2.MsgResync':
+                    mlog.debug('received msg resync')
+                    async with self._send_lock:
+                        await self._send_msg_slave()
+
+                else:
                     raise Exception('unsupported message type')
 
-                mlog.debug('received msg master')
-                components = [common.component_info_from_sbs(i)
-                              for i in msg_data['components']]
-                self._state = State(mid=msg_data['mid'],
-                                    global_components=components)
-
-                if self._state_cb:
-                    await aio.call(self._state_cb, self, self._state)
-
         except ConnectionError:
             pass
 
@@ -112,7 +179,66 @@ class Slave(aio.Resource):
             mlog.debug('stopping slave loop')
             self.close()
 
-    async def _send_msg_slave(self, local_components):
-        await common.send_msg(self._conn, 'HatObserver.MsgSlave', {
-            'components': [common.component_info_to_sbs(i)
-                           for i in local_components]})
+    async def _process_msg_master(self, mid, version, components):
+        self._version = version
+        self._components = {common.get_component_id(i): i
+                            for i in components}
+
+        if mid == self._state.mid and version == self._state.version:
+            return
+
+        self._state = State(mid=mid,
+                            global_components=components,
+                            version=version)
+
+        if self._state_cb:
+            await aio.call(self._state_cb, self, self._state)
+
+    async def _process_msg_master_delta(self, version, delta):
+        if self._version is None:
+            return
+
+        if version != self._version + 1:
+            mlog.warning('detected state version gap - requesting resync')
+            self._version = None
+            async with self._send_lock:
+                await common.send_msg(self._conn, 'HatObserver2.MsgResync',
+                                      None)
+            return
+
+        self._version = version
+        common.apply_components_delta(self._components, delta)
+        self._state = self._state._replace(
+            global_components=list(self._components.values()),
+            version=version)
+
+        if self._state_cb:
+            await aio.call(self._state_cb, self, self._state)
+
+    async def _send_msg_slave(self):
+        local_components = {i.cid: i for i in self._local_components}
+        self._sbs_cache.remove(cid for cid in self._sent_local_components
+                               if cid not in local_components)
+        self._sent_local_components = local_components
+
+        await common.send_msg(self._conn, 'HatObserver2.MsgSlave', {
+            'seq': next(self._next_seqs),
+            'components': [self._sbs_cache.get(i)
+                           for i in self._sent_local_components.values()]})
+
+    async def _send_msg_slave_delta(self):
+        local_components, delta = common.get_components_delta(
+            self._sent_local_components, self._local_components,
+            lambda i: i.cid)
+
+        if common.is_components_delta_empty(delta):
+            return
+
+        self._sent_local_components = local_components
+        self._sbs_cache.remove(delta.removed)
+
+        await common.send_msg(self._conn, 'HatObserver2.MsgSlaveDelta', {
+            'seq': next(self._next_seqs),
+            'added': [self._sbs_cache.get(i) for i in delta.added],
+            'changed': [self._sbs_cache.get(i) for i in delta.changed],
+            'removed': delta.removed})
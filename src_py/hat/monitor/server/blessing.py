@@ -4,7 +4,14 @@ from collections.abc import Iterable
 import collections
 import enum
 import itertools
+import math
 import time
+import typing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 from hat.monitor import common
 
@@ -15,11 +22,281 @@ _next_tokens = itertools.count(1)
 class Algorithm(enum.Enum):
     BLESS_ALL = 'BLESS_ALL'
     BLESS_ONE = 'BLESS_ONE'
+    BLESS_N = 'BLESS_N'
+
+
+class AlgorithmConf(typing.NamedTuple):
+    """Algorithm with parameters
+
+    `count` is maximum number of blessed components (used only by
+    `Algorithm.BLESS_N`).
+
+    If `load_key` is set, `Algorithm.BLESS_ONE` and `Algorithm.BLESS_N`
+    prefer components with lower load among components with same rank.
+    Component's load is number associated with `load_key` in component's
+    data (components without valid load are least preferred).
+
+    Hysteresis parameters `hold_down` and `min_tenure` (in seconds) are
+    applied to `Algorithm.BLESS_ONE` and `Algorithm.BLESS_N` only by
+    `Engine`. Blessing is transferred from ready blessed component only
+    if that component has been blessed for at least `min_tenure` and
+    components which should receive blessing have been continuously ready
+    for at least `hold_down`. Blessings which don't require revocation of
+    other component's blessing (free `Algorithm.BLESS_N` slots) are not
+    postponed.
+
+    If `standby` is set, `Algorithm.BLESS_ONE` and `Algorithm.BLESS_N`
+    mark next-in-line component (most preferred ready component without
+    blessing) with blessing request's `standby` flag.
+
+    If `handover` is set, `Algorithm.BLESS_ONE` performs make-before-break
+    handover: while active component remains ready, blessing is not
+    transferred to other component until that component signals readiness
+    to take over (blessing response's `standby` flag). Once signaled, old
+    active component's blessing is revoked in the same calculation as new
+    blessing token is issued. Next-in-line component is marked as standby
+    (same as with `standby` set).
+
+    """
+    algorithm: Algorithm
+    count: int = 1
+    load_key: str | None = None
+    hold_down: float = 0
+    min_tenure: float = 0
+    standby: bool = False
+    handover: bool = False
+
+
+class EngineStats(typing.NamedTuple):
+    evaluated_groups: int = 0
+    skipped_groups: int = 0
+    suppressed_transfers: int = 0
+    downtime: float = 0
+
+
+class Engine:
+    """Incremental blessing calculation engine
+
+    Engine keeps components from previous calculation indexed by group.
+    Blessing requests are calculated only for groups which contain
+    added, changed or removed components - components are compared based on
+    identity.
+
+    Engine also applies algorithms' hysteresis parameters (see
+    `AlgorithmConf`). Blessing transfers postponed because of hysteresis
+    are counted as suppressed transfers. Time of next required calculation
+    (regardless of components changes) is available as `next_calculation`.
+
+    Engine measures downtime - total duration of intervals during which
+    groups, that previously had active component (ready component with
+    matching blessing request and response tokens), had no active
+    component.
+
+    Args:
+        group_algorithms: association of algorithm to group
+        default_algorithm: default algorithm
+
+    """
+
+    def __init__(self,
+                 group_algorithms: dict[str, Algorithm | AlgorithmConf],
+                 default_algorithm: Algorithm | AlgorithmConf):
+        self._group_algorithms = group_algorithms
+        self._default_algorithm = default_algorithm
+        self._components = {}
+        self._group_components = collections.defaultdict(dict)
+        self._ready_since = {}
+        self._group_deadlines = {}
+        self._suppressed = set()
+        self._evaluated_groups = 0
+        self._skipped_groups = 0
+        self._suppressed_transfers = 0
+        self._active_groups = set()
+        self._group_inactive_since = {}
+        self._downtime = 0
+
+    @property
+    def stats(self) -> EngineStats:
+        """Engine statistics"""
+        return EngineStats(evaluated_groups=self._evaluated_groups,
+                           skipped_groups=self._skipped_groups,
+                           suppressed_transfers=self._suppressed_transfers,
+                           downtime=self._downtime)
+
+    @property
+    def next_calculation(self) -> float | None:
+        """Timestamp of next required calculation"""
+        return min(self._group_deadlines.values(), default=None)
+
+    def calculate(self,
+                  components: Iterable[common.ComponentInfo]
+                  ) -> list[tuple[common.Mid, common.Cid, common.BlessingReq]]:
+        """Calculate blessing request changes
+
+        Args:
+            components: components state with previous blessing tokens
+
+        Returns:
+            blessing request changes
+
+        """
+        now = time.time()
+        changed_groups = {group for group, deadline
+                          in self._group_deadlines.items()
+                          if deadline <= now}
+        component_ids = set()
+
+        for c in components:
+            component_id = c.mid, c.cid
+            component_ids.add(component_id)
+
+            old_c = self._components.get(component_id)
+            if old_c is c:
+                continue
+
+            self._components[component_id] = c
+
+            if not c.blessing_res.ready:
+                self._ready_since.pop(component_id, None)
+
+            elif component_id not in self._ready_since:
+                self._ready_since[component_id] = now
+
+            if old_c is not None and old_c.group != c.group:
+                self._suppressed.discard(component_id)
+                self._remove_group_component(old_c.group, component_id)
+                changed_groups.add(old_c.group)
+
+            self._group_components[c.group][component_id] = c
+            changed_groups.add(c.group)
+
+        if len(component_ids) != len(self._components):
+            for component_id in self._components.keys() - component_ids:
+                old_c = self._components.pop(component_id)
+                self._ready_since.pop(component_id, None)
+                self._suppressed.discard(component_id)
+                self._remove_group_component(old_c.group, component_id)
+                changed_groups.add(old_c.group)
+
+        changes = []
+        evaluated_groups = 0
+
+        for group in changed_groups:
+            self._group_deadlines.pop(group, None)
+
+            components_from_group = self._group_components.get(group)
+            self._update_downtime(group, components_from_group, now)
+
+            if not components_from_group:
+                continue
+
+            conf = _get_algorithm_conf(
+                self._group_algorithms.get(group, self._default_algorithm))
+            group_changes = list(_calculate_group(
+                conf, components_from_group.values()))
+
+            if ((conf.hold_down or conf.min_tenure) and
+                    conf.algorithm in (Algorithm.BLESS_ONE,
+                                       Algorithm.BLESS_N)):
+                group_changes = self._apply_hysteresis(
+                    group, conf, components_from_group, group_changes, now)
+
+            changes.extend(group_changes)
+            evaluated_groups += 1
+
+        self._evaluated_groups += evaluated_groups
+        self._skipped_groups += len(self._group_components) - evaluated_groups
+
+        return changes
+
+    def _update_downtime(self, group, components, now):
+        active = components and any(_is_active(c)
+                                    for c in components.values())
+
+        if active:
+            self._active_groups.add(group)
+
+            inactive_since = self._group_inactive_since.pop(group, None)
+            if inactive_since is not None:
+                self._downtime += now - inactive_since
+
+        elif group in self._active_groups:
+            self._active_groups.remove(group)
+            self._group_inactive_since[group] = now
+
+    def _apply_hysteresis(self, group, conf, components, changes, now):
+        revoked_ids = {(mid, cid) for mid, cid, blessing_req in changes
+                       if blessing_req.token is None}
+        holders = [c for component_id, c in components.items()
+                   if component_id in revoked_ids and
+                   c.blessing_res.ready and
+                   _has_blessing(c)]
+
+        if not holders:
+            self._suppressed.difference_update(components.keys())
+            return changes
+
+        count = (conf.count if conf.algorithm == Algorithm.BLESS_N else 1)
+        highlanders = _select_highlanders(components.values(), count,
+                                          conf.load_key)
+        challengers_ready_since = max(
+            (self._ready_since.get((c.mid, c.cid), now)
+             for c in highlanders if not _has_blessing(c)),
+            default=-math.inf)
+        hold_down_deadline = challengers_ready_since + conf.hold_down
+
+        deadlines = {}
+        for c in holders:
+            deadline = max(c.blessing_req.timestamp + conf.min_tenure,
+                           hold_down_deadline)
+            if deadline > now:
+                deadlines[c.mid, c.cid] = deadline
+
+        if not deadlines:
+            self._suppressed.difference_update(components.keys())
+            return changes
+
+        self._group_deadlines[group] = min(deadlines.values())
+
+        for component_id in deadlines.keys():
+            if component_id in self._suppressed:
+                continue
+
+            self._suppressed.add(component_id)
+            self._suppressed_transfers += 1
+
+        blessed_ids = {component_id
+                       for component_id, c in components.items()
+                       if _has_blessing(c) and
+                       (component_id not in revoked_ids or
+                        component_id in deadlines)}
+        highlander_ids = {(c.mid, c.cid): i
+                          for i, c in enumerate(highlanders)}
+        granted_ids = sorted(
+            ((mid, cid) for mid, cid, blessing_req in changes
+             if blessing_req.token is not None and
+             (mid, cid) not in blessed_ids),
+            key=lambda i: highlander_ids.get(i, len(highlander_ids)))
+        granted_ids = set(granted_ids[:max(count - len(blessed_ids), 0)])
+
+        return [(mid, cid, blessing_req)
+                for mid, cid, blessing_req in changes
+                if (mid, cid) not in deadlines and
+                (blessing_req.token is None or
+                 (mid, cid) in blessed_ids or
+                 (mid, cid) in granted_ids)]
+
+    def _remove_group_component(self, group, component_id):
+        components_from_group = self._group_components[group]
+        del components_from_group[component_id]
+
+        if not components_from_group:
+            del self._group_components[group]
 
 
 def calculate(components: Iterable[common.ComponentInfo],
-              group_algorithms: dict[str, Algorithm],
-              default_algorithm: Algorithm
+              group_algorithms: dict[str, Algorithm | AlgorithmConf],
+              default_algorithm: Algorithm | AlgorithmConf
               ) -> Iterable[tuple[common.Mid, common.Cid, common.BlessingReq]]:
     """Calculate blessing request changes
 
@@ -42,16 +319,204 @@ def calculate(components: Iterable[common.ComponentInfo],
         yield from _calculate_group(algorithm, components_from_group)
 
 
+def calculate_vectorized(
+        components: Iterable[common.ComponentInfo],
+        group_algorithms: dict[str, Algorithm | AlgorithmConf],
+        default_algorithm: Algorithm | AlgorithmConf
+        ) -> list[tuple[common.Mid, common.Cid, common.BlessingReq]]:
+    """Calculate blessing request changes with NumPy
+
+    Result is identical to result of `calculate` (including order of
+    changes and order of newly generated tokens). Groups associated with
+    `Algorithm.BLESS_N`, with load-aware algorithms or with algorithms
+    marking standby components (including handover) are calculated without
+    vectorization. This implementation requires optional `numpy` dependency.
+
+    Args:
+        components: components state with previous blessing tokens
+        group_algorithms: association of algorithm to group
+        default_algorithm: default algorithm
+
+    Returns:
+        blessing request changes
+
+    """
+    if numpy is None:
+        raise Exception('numpy not available')
+
+    components = list(components)
+    count = len(components)
+    if not count:
+        return []
+
+    group_ids = {}
+    groups = numpy.fromiter(
+        (group_ids.setdefault(c.group, len(group_ids)) for c in components),
+        dtype=numpy.int64, count=count)
+    ranks = numpy.fromiter((c.rank for c in components),
+                           dtype=numpy.int64, count=count)
+    mids = numpy.fromiter((c.mid for c in components),
+                          dtype=numpy.int64, count=count)
+    ready = numpy.fromiter((c.blessing_res.ready for c in components),
+                           dtype=bool, count=count)
+    blessed = numpy.fromiter((bool(_has_blessing(c)) for c in components),
+                             dtype=bool, count=count)
+    has_res_token = numpy.fromiter(
+        (bool(c.blessing_res.token) for c in components),
+        dtype=bool, count=count)
+    has_req = numpy.fromiter((c.blessing_req != _no_blessing_req
+                              for c in components),
+                             dtype=bool, count=count)
+
+    algorithm_confs = [
+        _get_algorithm_conf(group_algorithms.get(group, default_algorithm))
+        for group in group_ids.keys()]
+    if any(not isinstance(conf.algorithm, Algorithm)
+           for conf in algorithm_confs):
+        raise ValueError('unsupported algorithm')
+
+    group_count = len(group_ids)
+    bless_all = numpy.array([conf.algorithm == Algorithm.BLESS_ALL
+                             for conf in algorithm_confs],
+                            dtype=bool)[groups]
+    bless_one = numpy.array([(conf.algorithm == Algorithm.BLESS_ONE and
+                              conf.load_key is None and
+                              not conf.standby and
+                              not conf.handover)
+                             for conf in algorithm_confs],
+                            dtype=bool)[groups]
+    highlanders = _get_highlanders(components, groups, group_count, ranks,
+                                   mids, ready & bless_one, blessed,
+                                   has_res_token & bless_one)
+
+    indexes = numpy.arange(count)
+    is_highlander = highlanders[groups] == indexes
+    granted = numpy.where(bless_one, is_highlander, ready)
+    new = granted & ~blessed
+    changed = (new | (~granted & has_req)) & (bless_all | bless_one)
+
+    group_changed_indexes = collections.defaultdict(list)
+    for i in indexes[changed].tolist():
+        group_changed_indexes[int(groups[i])].append(i)
+
+    group_components = collections.defaultdict(list)
+    if not numpy.all(bless_all | bless_one):
+        for i in numpy.flatnonzero(~(bless_all | bless_one)).tolist():
+            group_components[int(groups[i])].append(components[i])
+
+    result = []
+    for group, conf in enumerate(algorithm_confs):
+        if group in group_components:
+            result.extend(_calculate_group(conf, group_components[group]))
+            continue
+
+        for i in group_changed_indexes.get(group, []):
+            c = components[i]
+
+            if new[i]:
+                blessing_req = common.BlessingReq(token=next(_next_tokens),
+                                                  timestamp=time.time())
+
+            else:
+                blessing_req = _no_blessing_req
+
+            result.append((c.mid, c.cid, blessing_req))
+
+    return result
+
+
+def _get_highlanders(components, groups, group_count, ranks, mids,
+                     candidates, blessed, has_res_token):
+    highlanders = numpy.full(group_count, -1, dtype=numpy.int64)
+
+    indexes = numpy.flatnonzero(candidates)
+    if not len(indexes):
+        return highlanders
+
+    min_ranks = numpy.full(group_count, numpy.iinfo(numpy.int64).max,
+                           dtype=numpy.int64)
+    numpy.minimum.at(min_ranks, groups[indexes], ranks[indexes])
+    indexes = indexes[ranks[indexes] == min_ranks[groups[indexes]]]
+
+    blessed_counts = numpy.bincount(groups[indexes[blessed[indexes]]],
+                                    minlength=group_count)
+
+    # groups without blessed candidates - lowest mid (first on ties)
+    unblessed = indexes[blessed_counts[groups[indexes]] == 0]
+    unblessed = unblessed[numpy.lexsort((unblessed,
+                                         mids[unblessed],
+                                         groups[unblessed]))]
+    unblessed_groups = groups[unblessed]
+    first = numpy.ones(len(unblessed), dtype=bool)
+    first[1:] = unblessed_groups[1:] != unblessed_groups[:-1]
+    highlanders[unblessed_groups[first]] = unblessed[first]
+
+    # groups with single blessed candidate
+    blessed_indexes = indexes[blessed[indexes]]
+    single = blessed_counts[groups[blessed_indexes]] == 1
+    highlanders[groups[blessed_indexes[single]]] = blessed_indexes[single]
+
+    # groups with multiple blessed candidates - sequential battle
+    group_blessed_indexes = collections.defaultdict(list)
+    for i in blessed_indexes[~single].tolist():
+        group_blessed_indexes[int(groups[i])].append(i)
+
+    for group, indexes in group_blessed_indexes.items():
+        highlander = indexes[0]
+        for i in indexes[1:]:
+            c = components[i]
+            h = components[highlander]
+            if (c.blessing_req.timestamp < h.blessing_req.timestamp or
+                    c.mid < h.mid):
+                highlander = i
+
+        highlanders[group] = highlander
+
+    # highlander without matching tokens is revoked if any other
+    # component from group has blessing response token
+    res_token_counts = numpy.bincount(groups[has_res_token],
+                                      minlength=group_count)
+    for group in numpy.flatnonzero(highlanders >= 0).tolist():
+        i = int(highlanders[group])
+        c = components[i]
+        if c.blessing_res.token and (c.blessing_res.token ==
+                                     c.blessing_req.token):
+            continue
+
+        if res_token_counts[group] - has_res_token[i] > 0:
+            highlanders[group] = -1
+
+    return highlanders
+
+
 def _calculate_group(algorithm, components):
-    if algorithm == Algorithm.BLESS_ALL:
+    conf = _get_algorithm_conf(algorithm)
+
+    if conf.algorithm == Algorithm.BLESS_ALL:
         yield from _bless_all(components)
+        return
+
+    if conf.algorithm == Algorithm.BLESS_ONE:
+        changes = _bless_one(components, conf.load_key, conf.handover)
 
-    elif algorithm == Algorithm.BLESS_ONE:
-        yield from _bless_one(components)
+    elif conf.algorithm == Algorithm.BLESS_N:
+        changes = _bless_n(components, conf.count, conf.load_key)
 
     else:
         raise ValueError('unsupported algorithm')
 
+    if conf.standby or conf.handover:
+        changes = _mark_standby(components, changes, conf.load_key)
+
+    yield from changes
+
+
+def _get_algorithm_conf(algorithm):
+    if isinstance(algorithm, AlgorithmConf):
+        return algorithm
+
+    return AlgorithmConf(algorithm=algorithm)
+
 
 def _bless_all(components):
     for c in components:
@@ -70,36 +535,24 @@ def _bless_all(components):
             yield c.mid, c.cid, blessing_req
 
 
-def _bless_one(components):
-
-    def highlander_battle(highlander, c):
-        if not highlander:
-            return c
-        if c.rank < highlander.rank:
-            return c
-        if c.rank == highlander.rank:
-            if _has_blessing(c) and not _has_blessing(highlander):
-                return c
-            if _has_blessing(c) and _has_blessing(highlander):
-                if (c.blessing_req.timestamp <
-                        highlander.blessing_req.timestamp):
-                    return c
-            if _has_blessing(c) and _has_blessing(highlander) or (
-                    not _has_blessing(c) and
-                    not _has_blessing(highlander)):
-                if c.mid < highlander.mid:
-                    return c
-        return highlander
-
+def _bless_one(components, load_key=None, handover=False):
     highlander = None
     for c in components:
         if not c.blessing_res.ready:
             continue
-        highlander = highlander_battle(highlander, c)
+        highlander = _highlander_battle(highlander, c, load_key)
+
+    handover_ready = bool(handover and highlander and
+                          (_has_blessing(highlander) or
+                           highlander.blessing_res.standby))
 
-    if highlander and not (highlander.blessing_res.token and
-                           highlander.blessing_res.token ==
-                           highlander.blessing_req.token):
+    if handover and highlander and not handover_ready:
+        highlander = next((c for c in components if _is_active(c)),
+                          highlander)
+
+    if highlander and not handover_ready and not (
+            highlander.blessing_res.token and
+            highlander.blessing_res.token == highlander.blessing_req.token):
         for c in components:
             if c.blessing_res.token and c != highlander:
                 highlander = None
@@ -121,6 +574,122 @@ def _bless_one(components):
             yield c.mid, c.cid, blessing_req
 
 
+def _highlander_battle(highlander, c, load_key=None):
+    if not highlander:
+        return c
+    if c.rank < highlander.rank:
+        return c
+    if c.rank == highlander.rank:
+        if _has_blessing(c) and not _has_blessing(highlander):
+            return c
+        if (load_key is not None and
+                not _has_blessing(c) and
+                not _has_blessing(highlander)):
+            c_load = _get_load(c, load_key)
+            highlander_load = _get_load(highlander, load_key)
+            if c_load < highlander_load:
+                return c
+            if c_load > highlander_load:
+                return highlander
+        if _has_blessing(c) and _has_blessing(highlander):
+            if (c.blessing_req.timestamp <
+                    highlander.blessing_req.timestamp):
+                return c
+        if _has_blessing(c) and _has_blessing(highlander) or (
+                not _has_blessing(c) and
+                not _has_blessing(highlander)):
+            if c.mid < highlander.mid:
+                return c
+    return highlander
+
+
+def _bless_n(components, count, load_key=None):
+    components = list(components)
+    highlanders = _select_highlanders(components, count, load_key)
+
+    active = [c for c in highlanders
+              if c.blessing_res.token and
+              c.blessing_res.token == c.blessing_req.token]
+    pending = [c for c in highlanders if c not in active]
+    others_with_token = [c for c in components
+                         if c.blessing_res.token and c not in highlanders]
+    pending = pending[:max(count - len(active) - len(others_with_token), 0)]
+
+    for c in components:
+        if c not in active and c not in pending:
+            blessing_req = common.BlessingReq(token=None,
+                                              timestamp=None)
+
+        elif not _has_blessing(c):
+            blessing_req = common.BlessingReq(token=next(_next_tokens),
+                                              timestamp=time.time())
+
+        else:
+            blessing_req = c.blessing_req
+
+        if c.blessing_req != blessing_req:
+            yield c.mid, c.cid, blessing_req
+
+
+def _mark_standby(components, changes, load_key):
+    blessing_reqs = {(mid, cid): blessing_req
+                     for mid, cid, blessing_req in changes}
+
+    standby = None
+    for c in components:
+        blessing_req = blessing_reqs.get((c.mid, c.cid), c.blessing_req)
+        if (c.blessing_res.ready and
+                not c.blessing_res.token and
+                blessing_req.token is None):
+            standby = _highlander_battle(standby, c, load_key)
+
+    for c in components:
+        blessing_req = blessing_reqs.get((c.mid, c.cid), c.blessing_req)
+        if blessing_req.token is None:
+            blessing_req = blessing_req._replace(standby=(c is standby))
+
+        if c.blessing_req != blessing_req:
+            yield c.mid, c.cid, blessing_req
+
+
+_no_blessing_req = common.BlessingReq(token=None,
+                                      timestamp=None)
+
+
+def _select_highlanders(components, count, load_key):
+    candidates = [c for c in components if c.blessing_res.ready]
+
+    highlanders = []
+    while candidates and len(highlanders) < count:
+        highlander = None
+        for c in candidates:
+            highlander = _highlander_battle(highlander, c, load_key)
+
+        highlanders.append(highlander)
+        candidates = [c for c in candidates if c != highlander]
+
+    return highlanders
+
+
+def _get_load(component, load_key):
+    data = component.data
+    if not isinstance(data, dict):
+        return math.inf
+
+    load = data.get(load_key)
+    if isinstance(load, bool) or not isinstance(load, (int, float)):
+        return math.inf
+
+    return load
+
+
+def _is_active(component):
+    return bool(component.blessing_res.ready and
+                component.blessing_res.token and
+                component.blessing_res.token ==
+                component.blessing_req.token)
+
+
 def _has_blessing(component):
     return (component.blessing_req.token and
             component.blessing_req.timestamp)
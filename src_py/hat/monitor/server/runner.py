@@ -3,11 +3,14 @@ import asyncio
 import contextlib
 import itertools
 import logging
+import time
 
 from hat import aio
 from hat import json
 from hat.drivers import tcp
 
+import hat.monitor.common
+import hat.monitor.observer.common
 import hat.monitor.observer.master
 import hat.monitor.observer.server
 import hat.monitor.observer.slave
@@ -27,13 +30,16 @@ async def create(conf: json.Data) -> 'Runner':
     runner._master = None
     runner._ui = None
     runner._slave = None
+    runner._slave_addr = None
+    runner._standby_slaves = {}
     runner._slave_conf = conf['slave']
     runner._slave_parents = [tcp.Address(i['host'], i['port'])
                              for i in conf['slave']['parents']]
-    runner._default_algorithm = hat.monitor.server.blessing.Algorithm(
-        conf['default_algorithm'])
-    runner._group_algorithms = {k: hat.monitor.server.blessing.Algorithm(v)
-                                for k, v in conf['group_algorithms'].items()}
+    runner._blessing_engine = hat.monitor.server.blessing.Engine(
+        group_algorithms={k: _algorithm_from_conf(v)
+                          for k, v in conf['group_algorithms'].items()},
+        default_algorithm=_algorithm_from_conf(conf['default_algorithm']))
+    runner._blessing_timer = None
 
     runner.async_group.spawn(aio.call_on_cancel, runner._on_close)
 
@@ -42,12 +48,25 @@ async def create(conf: json.Data) -> 'Runner':
         runner._server = await hat.monitor.observer.server.listen(
             tcp.Address(conf['server']['host'], conf['server']['port']),
             default_rank=conf['server']['default_rank'],
+            broadcast_delay=conf['server'].get('broadcast_delay'),
+            send_queue_size=conf['server'].get('send_queue_size', 1024),
+            overflow_policy=hat.monitor.observer.common.OverflowPolicy(
+                conf['server'].get('overflow_policy', 'RESYNC')),
+            conflate=conf['server'].get('conflate', False),
+            session_timeout=conf['server'].get('session_timeout'),
             state_cb=runner._on_server_state)
         runner._bind_resource(runner._server)
 
         mlog.debug('starting master')
         runner._master = await hat.monitor.observer.master.listen(
             tcp.Address(conf['master']['host'], conf['master']['port']),
+            update_delay=conf['master'].get('update_delay'),
+            send_queue_size=conf['master'].get('send_queue_size', 1024),
+            overflow_policy=hat.monitor.observer.common.OverflowPolicy(
+                conf['master'].get('overflow_policy', 'RESYNC')),
+            conflate=conf['master'].get('conflate', False),
+            accept_standby=conf['master'].get('accept_standby', False),
+            promote_timeout=conf['master'].get('standby_promote_timeout', 5),
             global_components_cb=runner._on_master_global_components,
             blessing_cb=runner._calculate_blessing)
         runner._bind_resource(runner._master)
@@ -70,6 +89,9 @@ async def create(conf: json.Data) -> 'Runner':
 
         runner.async_group.spawn(runner._runner_loop)
 
+        if runner._slave_parents and conf['slave'].get('standby_links'):
+            runner.async_group.spawn(runner._standby_loop)
+
     except BaseException:
         await aio.uncancellable(runner.async_close())
         raise
@@ -84,6 +106,10 @@ class Runner(aio.Resource):
         return self._async_group
 
     async def _on_close(self):
+        if self._blessing_timer:
+            self._blessing_timer.cancel()
+            self._blessing_timer = None
+
         if self._ui:
             await self._ui.async_close()
 
@@ -96,6 +122,9 @@ class Runner(aio.Resource):
         if self._slave:
             await self._slave.async_close()
 
+        for slave in self._standby_slaves.values():
+            await slave.async_close()
+
     async def _on_server_state(self, server, state):
         if self._ui:
             self._ui.set_state(state)
@@ -138,6 +167,9 @@ class Runner(aio.Resource):
                 await self._loop.create_future()
 
             while True:
+                if not self._slave:
+                    await self._promote_standby_slave()
+
                 if not self._slave:
                     await self._create_slave_loop(
                         self._slave_conf['connect_retry_count'])
@@ -149,6 +181,7 @@ class Runner(aio.Resource):
                 elif self._slave:
                     await self._slave.async_close()
                     self._slave = None
+                    self._slave_addr = None
 
                 else:
                     mlog.debug('no master detected - activating local master')
@@ -164,15 +197,76 @@ class Runner(aio.Resource):
         finally:
             self.close()
 
+    async def _standby_loop(self):
+        try:
+            while True:
+                for addr in self._slave_parents:
+                    slave = self._standby_slaves.get(addr)
+
+                    if addr == self._slave_addr:
+                        if slave:
+                            del self._standby_slaves[addr]
+                            await slave.async_close()
+                        continue
+
+                    if slave and slave.is_open:
+                        continue
+
+                    with contextlib.suppress(Exception):
+                        self._standby_slaves[addr] = await self._create_slave(
+                            addr, standby=True)
+
+                await asyncio.sleep(self._slave_conf['connect_retry_delay'])
+
+        except Exception as e:
+            mlog.error('standby loop error: %s', e, exc_info=e)
+
+        finally:
+            self.close()
+
+    async def _promote_standby_slave(self):
+        for addr in self._slave_parents:
+            slave = self._standby_slaves.pop(addr, None)
+            if not slave:
+                continue
+
+            try:
+                await slave.update(self._server.state.local_components)
+                await slave.promote()
+
+            except ConnectionError:
+                await aio.uncancellable(slave.async_close())
+                continue
+
+            mlog.debug('promoted standby connection to %s', addr)
+            self._slave = slave
+            self._slave_addr = addr
+            return
+
     def _bind_resource(self, resource):
         self.async_group.spawn(aio.call_on_done, resource.wait_closing(),
                                self.close)
 
     def _calculate_blessing(self, master, components):
-        yield from hat.monitor.server.blessing.calculate(
-            components=components,
-            default_algorithm=self._default_algorithm,
-            group_algorithms=self._group_algorithms)
+        changes = self._blessing_engine.calculate(components)
+
+        if self._blessing_timer:
+            self._blessing_timer.cancel()
+            self._blessing_timer = None
+
+        next_calculation = self._blessing_engine.next_calculation
+        if next_calculation is not None:
+            self._blessing_timer = self._loop.call_later(
+                max(next_calculation - time.time(), 0),
+                self._on_blessing_timer)
+
+        return changes
+
+    def _on_blessing_timer(self):
+        self._blessing_timer = None
+
+        if self._master and self.is_open:
+            self.async_group.spawn(self._master.calculate_blessing)
 
     async def _set_master_active(self, active):
         self._master.set_active(active)
@@ -189,25 +283,110 @@ class Runner(aio.Resource):
         counter = (range(retry_count + 1) if retry_count is not None
                    else itertools.repeat(None))
 
-        for count in counter:
-            for addr in self._slave_parents:
-                with contextlib.suppress(Exception):
-                    self._slave = await self._create_slave(addr)
+        connect_stagger = self._slave_conf.get('connect_stagger')
+
+        for attempt, count in enumerate(counter):
+            if connect_stagger is not None:
+                result = await self._race_create_slave(connect_stagger)
+                if result:
+                    self._slave_addr, self._slave = result
                     return
 
+            else:
+                for addr in self._slave_parents:
+                    with contextlib.suppress(Exception):
+                        self._slave = await self._create_slave(addr)
+                        self._slave_addr = addr
+                        return
+
             if count is None or count < retry_count:
-                await asyncio.sleep(self._slave_conf['connect_retry_delay'])
+                delay = hat.monitor.common.get_backoff_delay(
+                    attempt=attempt,
+                    delay=self._slave_conf['connect_retry_delay'],
+                    max_delay=self._slave_conf.get('connect_retry_max_delay'),
+                    jitter=self._slave_conf.get('connect_retry_jitter', False))
+                await asyncio.sleep(delay)
+
+    async def _race_create_slave(self, connect_stagger):
+        addrs = iter(self._slave_parents)
+        addr = next(addrs, None)
+        tasks = []
+        pending = set()
+        result = None
+
+        try:
+            async with self.async_group.create_subgroup() as subgroup:
+                while result is None and (addr is not None or pending):
+                    if addr is not None:
+                        task = subgroup.spawn(self._try_create_slave, addr)
+                        tasks.append(task)
+                        pending.add(task)
+                        addr = next(addrs, None)
+
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=(connect_stagger if addr is not None
+                                 else None),
+                        return_when=asyncio.FIRST_COMPLETED)
+
+                    result = next((task.result() for task in tasks
+                                   if task in done and task.result()),
+                                  None)
+
+        except BaseException:
+            result = None
+            raise
+
+        finally:
+            for task in tasks:
+                if not task.done() or task.cancelled():
+                    continue
+
+                task_result = task.result()
+                if task_result and task_result is not result:
+                    await aio.uncancellable(task_result[1].async_close())
+
+        return result
+
+    async def _try_create_slave(self, addr):
+        try:
+            return addr, await self._create_slave(addr)
+
+        except Exception as e:
+            mlog.debug('connect to %s failed: %s', addr, e, exc_info=e)
+
+    async def _create_slave(self, addr, standby=False):
+        kwargs = {}
+        if standby:
+            kwargs['ping_delay'] = self._slave_conf.get('standby_ping_delay',
+                                                        20)
+            kwargs['ping_timeout'] = self._slave_conf['connect_timeout']
 
-    async def _create_slave(self, addr):
         try:
             return await aio.wait_for(
                 hat.monitor.observer.slave.connect(
                     addr,
                     local_components=self._server.state.local_components,
-                    state_cb=self._on_slave_state),
+                    standby=standby,
+                    state_cb=self._on_slave_state,
+                    **kwargs),
                 self._slave_conf['connect_timeout'])
 
         except aio.CancelledWithResultError as e:
             if e.result:
                 await aio.uncancellable(e.result.async_close())
             raise
+
+
+def _algorithm_from_conf(conf):
+    if isinstance(conf, str):
+        return hat.monitor.server.blessing.Algorithm(conf)
+
+    return hat.monitor.server.blessing.AlgorithmConf(
+        algorithm=hat.monitor.server.blessing.Algorithm(conf['algorithm']),
+        count=conf.get('count', 1),
+        load_key=conf.get('load_key'),
+        hold_down=conf.get('hold_down', 0),
+        min_tenure=conf.get('min_tenure', 0),
+        standby=conf.get('standby', False),
+        handover=conf.get('handover', False))
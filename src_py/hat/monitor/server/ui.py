@@ -117,6 +117,8 @@ def _get_global_components(state):
                'data': i.data,
                'rank': i.rank,
                'blessing_req': {'token': i.blessing_req.token,
-                                'timestamp': i.blessing_req.timestamp},
+                                'timestamp': i.blessing_req.timestamp,
+                                'standby': i.blessing_req.standby},
                'blessing_res': {'token': i.blessing_res.token,
-                                'ready': i.blessing_res.ready}}
+                                'ready': i.blessing_res.ready,
+                                'standby': i.blessing_res.standby}}
@@ -276,3 +276,239 @@ async def test_close_component_when_runner_closed(addr):
     await conn.wait_closed()
 
     await srv.async_close()
+
+
+async def test_standby(addr):
+    event_queue = aio.Queue()
+    srv_state_queue = aio.Queue()
+
+    class StandbyRunner(component.StandbyRunner):
+
+        def __init__(self):
+            self._async_group = aio.Group()
+            self._async_group.spawn(aio.call_on_cancel,
+                                    event_queue.put_nowait, 'close')
+
+        @property
+        def async_group(self):
+            return self._async_group
+
+        async def promote(self):
+            event_queue.put_nowait('promote')
+
+    def create_runner(c):
+        event_queue.put_nowait('create')
+        return aio.Group()
+
+    def create_standby_runner(c):
+        event_queue.put_nowait('standby')
+        return StandbyRunner()
+
+    def on_srv_state(s, state):
+        srv_state_queue.put_nowait(state)
+
+    async def update_blessing_req(req):
+        info = srv.state.local_components[0]
+        await srv.update(mid=info.mid,
+                         global_components=[info._replace(blessing_req=req)])
+
+    async def wait_res_token(token):
+        while True:
+            srv_state = await srv_state_queue.get()
+            info = srv_state.local_components[0]
+            if info.blessing_res.token == token:
+                return
+
+    srv = await server.listen(addr, state_cb=on_srv_state)
+    conn = await component.connect(addr, 'name', 'group', create_runner,
+                                   standby_cb=create_standby_runner)
+
+    await srv_state_queue.get()
+    await conn.set_ready(True)
+    await srv_state_queue.get()
+
+    await update_blessing_req(common.BlessingReq(token=None,
+                                                 timestamp=None,
+                                                 standby=True))
+    assert await event_queue.get() == 'standby'
+
+    while not srv.state.local_components[0].blessing_res.standby:
+        await srv_state_queue.get()
+
+    await update_blessing_req(common.BlessingReq(token=None,
+                                                 timestamp=None))
+    assert await event_queue.get() == 'close'
+
+    while srv.state.local_components[0].blessing_res.standby:
+        await srv_state_queue.get()
+
+    await update_blessing_req(common.BlessingReq(token=None,
+                                                 timestamp=None,
+                                                 standby=True))
+    assert await event_queue.get() == 'standby'
+
+    req = common.BlessingReq(token=123,
+                             timestamp=321)
+    await update_blessing_req(req)
+    await wait_res_token(req.token)
+    await update_blessing_req(req)
+
+    assert await event_queue.get() == 'promote'
+
+    await update_blessing_req(common.BlessingReq(token=None,
+                                                 timestamp=None))
+    assert await event_queue.get() == 'close'
+
+    await wait_res_token(None)
+
+    await update_blessing_req(req)
+    await wait_res_token(req.token)
+    await update_blessing_req(req)
+
+    assert await event_queue.get() == 'create'
+    assert event_queue.empty()
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_reconnect(addr):
+    start_queue = aio.Queue()
+    stop_queue = aio.Queue()
+    srv_state_queue = aio.Queue()
+
+    def create_runner(c):
+        runner = aio.Group()
+        start_queue.put_nowait(None)
+        runner.spawn(aio.call_on_cancel, stop_queue.put_nowait, None)
+        return runner
+
+    def on_srv_state(s, state):
+        srv_state_queue.put_nowait(state)
+
+    async def wait_srv_info(cond):
+        while True:
+            srv_state = await srv_state_queue.get()
+            if (srv_state.local_components and
+                    cond(srv_state.local_components[0])):
+                return srv_state.local_components[0]
+
+    async def bless(srv, req):
+        info = await wait_srv_info(lambda i: i.blessing_res.ready)
+        await srv.update(mid=info.mid,
+                         global_components=[info._replace(blessing_req=req)])
+
+        info = await wait_srv_info(
+            lambda i: i.blessing_res.token == req.token)
+        await srv.update(mid=info.mid,
+                         global_components=[info])
+
+    reconnect_policy = component.ReconnectPolicy(delay=0.01,
+                                                 jitter=False,
+                                                 grace_period=1)
+    req = common.BlessingReq(token=123,
+                             timestamp=321)
+
+    srv = await server.listen(addr, state_cb=on_srv_state)
+    conn = await component.connect(addr, 'name', 'group', create_runner,
+                                   reconnect_policy=reconnect_policy)
+    await conn.set_ready(True)
+    await bless(srv, req)
+    await start_queue.get()
+
+    await srv.async_close()
+    await asyncio.sleep(0.05)
+
+    assert conn.is_open
+    assert stop_queue.empty()
+
+    srv = await server.listen(addr, state_cb=on_srv_state)
+    info = await wait_srv_info(lambda i: i.blessing_res.token == req.token)
+    await srv.update(mid=info.mid,
+                     global_components=[info._replace(blessing_req=req)])
+
+    await asyncio.sleep(0.05)
+
+    assert conn.is_open
+    assert conn.ready
+    assert start_queue.empty()
+    assert stop_queue.empty()
+
+    await srv.async_close()
+    await stop_queue.get()
+
+    assert conn.is_open
+
+    await conn.async_close()
+
+
+@pytest.mark.parametrize('grace_period', [0, 0.05])
+async def test_reconnect_grace_period(addr, grace_period):
+    start_queue = aio.Queue()
+    stop_queue = aio.Queue()
+    srv_state_queue = aio.Queue()
+
+    def create_runner(c):
+        runner = aio.Group()
+        start_queue.put_nowait(None)
+        runner.spawn(aio.call_on_cancel, stop_queue.put_nowait, None)
+        return runner
+
+    def on_srv_state(s, state):
+        srv_state_queue.put_nowait(state)
+
+    reconnect_policy = component.ReconnectPolicy(delay=0.01,
+                                                 max_delay=0.01,
+                                                 jitter=False,
+                                                 max_attempts=10,
+                                                 grace_period=grace_period)
+    req = common.BlessingReq(token=123,
+                             timestamp=321)
+
+    srv = await server.listen(addr, state_cb=on_srv_state)
+    conn = await component.connect(addr, 'name', 'group', create_runner,
+                                   reconnect_policy=reconnect_policy)
+    await conn.set_ready(True)
+
+    while True:
+        info = (await srv_state_queue.get()).local_components[0]
+        if info.blessing_res.ready:
+            break
+
+    await srv.update(mid=info.mid,
+                     global_components=[info._replace(blessing_req=req)])
+
+    while True:
+        info = (await srv_state_queue.get()).local_components[0]
+        if info.blessing_res.token == req.token:
+            break
+
+    await srv.update(mid=info.mid,
+                     global_components=[info])
+    await start_queue.get()
+
+    await srv.async_close()
+
+    if grace_period:
+        with pytest.raises(asyncio.TimeoutError):
+            await aio.wait_for(stop_queue.get(), grace_period / 2)
+
+    await aio.wait_for(stop_queue.get(), 1)
+    assert conn.is_open
+
+    await conn.wait_closed()
+
+
+async def test_reconnect_max_attempts(addr):
+
+    def create_runner(c):
+        return aio.Group()
+
+    srv = await server.listen(addr)
+    conn = await component.connect(
+        addr, 'name', 'group', create_runner,
+        reconnect_policy=component.ReconnectPolicy(delay=0.01,
+                                                   max_attempts=3))
+
+    await srv.async_close()
+    await aio.wait_for(conn.wait_closed(), 1)
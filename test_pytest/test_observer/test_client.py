@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from hat import aio
@@ -33,36 +35,61 @@ async def test_connect(addr):
     await srv.async_close()
 
 
-async def test_msg_client(addr):
+@pytest.mark.parametrize('subscription, sbs_subscription', [
+    (None, ('none', None)),
+    ([], ('value', [])),
+    (['g1', 'g2'], ('value', ['g1', 'g2']))])
+async def test_msg_client(addr, subscription, sbs_subscription):
     srv_conn_queue = aio.Queue()
     srv = await chatter.listen(srv_conn_queue.put_nowait, addr)
 
     conn = await client.connect(addr,
                                 name='name',
                                 group='group',
-                                data='data')
+                                data='data',
+                                subscription=subscription)
     srv_conn = await srv_conn_queue.get()
 
     msg_type, msg_data = await common.receive_msg(srv_conn)
 
-    assert msg_type == 'HatObserver.MsgClient'
+    assert msg_type == 'HatObserver2.MsgClient'
     assert msg_data == {'name': 'name',
                         'group': 'group',
                         'data': '"data"',
                         'blessingRes': {'token': ('none', None),
-                                        'ready': False}}
+                                        'ready': False,
+                                        'standby': False},
+                        'subscription': sbs_subscription,
+                        'session': ('none', None)}
 
     await conn.set_blessing_res(common.BlessingRes(token=123,
                                                    ready=True))
 
     msg_type, msg_data = await common.receive_msg(srv_conn)
 
-    assert msg_type == 'HatObserver.MsgClient'
+    assert msg_type == 'HatObserver2.MsgClient'
     assert msg_data == {'name': 'name',
                         'group': 'group',
                         'data': '"data"',
                         'blessingRes': {'token': ('value', 123),
-                                        'ready': True}}
+                                        'ready': True,
+                                        'standby': False},
+                        'subscription': sbs_subscription,
+                        'session': ('none', None)}
+
+    await conn.set_data({'load': 0.5})
+
+    msg_type, msg_data = await common.receive_msg(srv_conn)
+
+    assert msg_type == 'HatObserver2.MsgClient'
+    assert msg_data == {'name': 'name',
+                        'group': 'group',
+                        'data': '{"load": 0.5}',
+                        'blessingRes': {'token': ('value', 123),
+                                        'ready': True,
+                                        'standby': False},
+                        'subscription': sbs_subscription,
+                        'session': ('none', None)}
 
     await conn.async_close()
     await srv.async_close()
@@ -97,23 +124,124 @@ async def test_msg_server(addr):
         blessing_res=common.BlessingRes(token=4321,
                                         ready=True))
 
-    await common.send_msg(srv_conn, 'HatObserver.MsgServer', {
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServer', {
         'cid': info.cid,
         'mid': info.mid,
-        'components': [common.component_info_to_sbs(info)]})
+        'version': 1,
+        'components': [common.component_info_to_sbs(info)],
+        'session': ('none', None)})
 
     state = await state_queue.get()
     assert state.info == info
     assert state.components == [info]
+    assert state.version == 1
+
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServer', {
+        'cid': info.cid,
+        'mid': info.mid,
+        'version': 1,
+        'components': [common.component_info_to_sbs(info)],
+        'session': ('none', None)})
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(state_queue.get(), 0.01)
+    assert conn.state is state
 
-    await common.send_msg(srv_conn, 'HatObserver.MsgServer', {
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServer', {
         'cid': 123,
         'mid': 321,
-        'components': []})
+        'version': 2,
+        'components': [],
+        'session': ('none', None)})
 
     state = await state_queue.get()
     assert state.info is None
     assert state.components == []
+    assert state.version == 2
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_msg_server_delta(addr):
+    state_queue = aio.Queue()
+
+    def on_state(conn, state):
+        state_queue.put_nowait(state)
+
+    srv_conn_queue = aio.Queue()
+    srv = await chatter.listen(srv_conn_queue.put_nowait, addr)
+
+    conn = await client.connect(addr,
+                                name='name',
+                                group='group',
+                                state_cb=on_state)
+    srv_conn = await srv_conn_queue.get()
+
+    info1 = common.ComponentInfo(
+        cid=1,
+        mid=2,
+        name='name 1',
+        group='group',
+        data=None,
+        rank=1,
+        blessing_req=common.BlessingReq(token=None,
+                                        timestamp=None),
+        blessing_res=common.BlessingRes(token=None,
+                                        ready=False))
+    info2 = info1._replace(cid=2,
+                           name='name 2')
+    info0 = info1._replace(cid=0,
+                           name='name 0')
+
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServer', {
+        'cid': info1.cid,
+        'mid': info1.mid,
+        'version': 1,
+        'components': [common.component_info_to_sbs(info1)],
+        'session': ('none', None)})
+
+    state = await state_queue.get()
+    assert state.info == info1
+    assert state.components == [info1]
+
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServerDelta', {
+        'mid': info1.mid,
+        'version': 2,
+        'delta': common.components_delta_to_sbs(
+            common.ComponentsDelta(added=[info2, info0],
+                                   changed=[],
+                                   removed=[]))})
+
+    state = await state_queue.get()
+    assert state.info == info1
+    assert state.components == [info0, info1, info2]
+
+    info1 = info1._replace(rank=2)
+
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServerDelta', {
+        'mid': info1.mid,
+        'version': 3,
+        'delta': common.components_delta_to_sbs(
+            common.ComponentsDelta(added=[],
+                                   changed=[info1],
+                                   removed=[(info2.mid, info2.cid)]))})
+
+    state = await state_queue.get()
+    assert state.info == info1
+    assert state.components == [info0, info1]
+
+    await common.send_msg(srv_conn, 'HatObserver2.MsgServerDelta', {
+        'mid': info1.mid,
+        'version': 4,
+        'delta': common.components_delta_to_sbs(
+            common.ComponentsDelta(added=[],
+                                   changed=[],
+                                   removed=[(info1.mid, info1.cid)]))})
+
+    state = await state_queue.get()
+    assert state.info is None
+    assert state.components == [info0]
 
     await conn.async_close()
     await srv.async_close()
@@ -132,7 +260,7 @@ async def test_msg_close(addr):
 
     assert close_queue.empty()
 
-    await common.send_msg(srv_conn, 'HatObserver.MsgClose', None)
+    await common.send_msg(srv_conn, 'HatObserver2.MsgClose', None)
 
     await close_queue.get()
 
@@ -1,13 +1,20 @@
 import pytest
 
+from hat import aio
+from hat import util
+from hat.drivers import chatter
+from hat.drivers import tcp
+
 from hat.monitor.observer import common
 
 
 @pytest.mark.parametrize('token', [None, 0, 1, 42])
 @pytest.mark.parametrize('timestamp', [None, 12345, 42.5])
-def test_encode_decode_blessing_req(token, timestamp):
+@pytest.mark.parametrize('standby', [True, False])
+def test_encode_decode_blessing_req(token, timestamp, standby):
     req = common.BlessingReq(token=token,
-                             timestamp=timestamp)
+                             timestamp=timestamp,
+                             standby=standby)
 
     encoded = common.blessing_req_to_sbs(req)
     decoded = common.blessing_req_from_sbs(encoded)
@@ -57,3 +64,321 @@ def test_encode_decode_component_info(cid, mid, name, group, data, rank,
     decoded = common.component_info_from_sbs(encoded)
 
     assert info == decoded
+
+
+def test_components_delta():
+    infos = [common.ComponentInfo(cid=i,
+                                  mid=i % 2,
+                                  name=f'name {i}',
+                                  group='group',
+                                  data=None,
+                                  rank=1,
+                                  blessing_req=common.BlessingReq(None, None),
+                                  blessing_res=common.BlessingRes(None, False))
+             for i in range(5)]
+    old_components = {common.get_component_id(i): i for i in infos[:3]}
+    new_infos = [infos[0]._replace(rank=2), infos[2], infos[3], infos[4]]
+
+    components, delta = common.get_components_delta(old_components,
+                                                    new_infos)
+
+    assert list(components.values()) == new_infos
+    assert delta.added == [infos[3], infos[4]]
+    assert delta.changed == [new_infos[0]]
+    assert delta.removed == [common.get_component_id(infos[1])]
+    assert not common.is_components_delta_empty(delta)
+
+    encoded = common.components_delta_to_sbs(delta)
+    decoded = common.components_delta_from_sbs(encoded)
+
+    assert decoded == delta
+
+    common.apply_components_delta(old_components, decoded)
+
+    assert old_components == components
+
+    _, delta = common.get_components_delta(components, new_infos)
+
+    assert common.is_components_delta_empty(delta)
+
+
+def test_encode_msg():
+    msg_data = {'version': 1,
+                'delta': {'added': [],
+                          'changed': [],
+                          'removed': [{'mid': 1, 'cid': 2}]}}
+
+    data = common.encode_msg('HatObserver2.MsgMasterDelta', msg_data)
+
+    assert data.type == 'HatObserver2.MsgMasterDelta'
+    assert common.sbs_repo.decode(data.type, data.data) == msg_data
+
+
+def test_component_info_sbs_cache():
+    cache = common.ComponentInfoSbsCache()
+
+    info = common.ComponentInfo(cid=1,
+                                mid=2,
+                                name='name',
+                                group='group',
+                                data={'abc': [1, 2, 3]},
+                                rank=1,
+                                blessing_req=common.BlessingReq(None, None),
+                                blessing_res=common.BlessingRes(None, False))
+
+    assert cache.cache_info == common.CacheInfo(hits=0,
+                                                misses=0,
+                                                currsize=0)
+
+    encoded = cache.get(info)
+    assert encoded == common.component_info_to_sbs(info)
+    assert cache.get(info) is encoded
+
+    assert cache.cache_info == common.CacheInfo(hits=1,
+                                                misses=1,
+                                                currsize=1)
+
+    equal_info = info._replace()
+    assert cache.get(equal_info) == encoded
+
+    assert cache.cache_info == common.CacheInfo(hits=1,
+                                                misses=2,
+                                                currsize=1)
+
+    other_info = info._replace(cid=3)
+    cache.get(other_info)
+
+    assert cache.cache_info == common.CacheInfo(hits=1,
+                                                misses=3,
+                                                currsize=2)
+
+    cache.remove([common.get_component_id(info), (42, 42)])
+
+    assert cache.cache_info == common.CacheInfo(hits=1,
+                                                misses=3,
+                                                currsize=1)
+
+    delta = common.ComponentsDelta(added=[info],
+                                   changed=[other_info],
+                                   removed=[])
+    assert (common.components_delta_to_sbs(delta, cache) ==
+            common.components_delta_to_sbs(delta))
+
+    assert cache.cache_info == common.CacheInfo(hits=2,
+                                                misses=4,
+                                                currsize=2)
+
+
+def test_encoded_data():
+    encoded = '{"abc": [1, 2, 3]}'
+    info = common.ComponentInfo(cid=1,
+                                mid=2,
+                                name='name',
+                                group='group',
+                                data=common.EncodedData(encoded),
+                                rank=1,
+                                blessing_req=common.BlessingReq(None, None),
+                                blessing_res=common.BlessingRes(None, False))
+
+    assert info.encoded_data == encoded
+    assert common.component_info_to_sbs(info)['data'] == encoded
+
+    decoded_info = info._replace(data={'abc': [1, 2, 3]})
+    assert info == decoded_info
+    assert info.data == decoded_info.data
+    assert info._replace(data={'abc': []}) != info
+
+    assert info == info._replace(data=common.EncodedData(encoded))
+    assert info == info._replace(
+        data=common.EncodedData('{"abc":[1,2,3]}'))
+    assert info != info._replace(data=common.EncodedData('null'))
+
+    info = common.component_info_from_sbs(
+        common.component_info_to_sbs(info))
+    assert info.encoded_data == encoded
+    assert info.data == {'abc': [1, 2, 3]}
+
+    assert info._asdict()['data'] == {'abc': [1, 2, 3]}
+    assert type(info._asdict()['data']) is dict
+    assert type(info[4]) is dict
+    assert type(info[3:5][1]) is dict
+    assert type(tuple(info)[4]) is dict
+
+    _, _, _, _, data, _, _, _ = info
+    assert type(data) is dict
+
+    info = info._replace(rank=2)
+    assert info.rank == 2
+    assert info.encoded_data == encoded
+
+    with pytest.raises(ValueError):
+        info._replace(abc=1)
+
+
+@pytest.mark.parametrize('encoded, other_encoded', [
+    ('null', 'null'),
+    ('42', '42.0'),
+    ('"abc"', '"abc"'),
+    ('[1, 2, 3]', '[1,2,3]'),
+    ('{"a": 1, "b": [{"c": null}]}', '{"b":[{"c":null}],"a":1}'),
+])
+def test_encoded_data_hash(encoded, other_encoded):
+    data = common.EncodedData(encoded)
+    other_data = common.EncodedData(other_encoded)
+
+    assert data == other_data
+    assert hash(data) == hash(other_data)
+    assert len({data, other_data}) == 1
+
+
+def test_get_backoff_delay():
+    delays = [common.get_backoff_delay(attempt=attempt,
+                                       delay=0.5)
+              for attempt in range(5)]
+    assert delays == [0.5] * 5
+
+    delays = [common.get_backoff_delay(attempt=attempt,
+                                       delay=0.5,
+                                       max_delay=3)
+              for attempt in range(5)]
+    assert delays == [0.5, 1, 2, 3, 3]
+
+    delay = common.get_backoff_delay(attempt=10000,
+                                     delay=0.5,
+                                     max_delay=3)
+    assert delay == 3
+
+    for attempt in range(100):
+        delay = common.get_backoff_delay(attempt=attempt,
+                                         delay=0.5,
+                                         max_delay=3,
+                                         jitter=True)
+        assert 0 <= delay <= min(3, 0.5 * 2 ** attempt)
+
+
+@pytest.mark.parametrize('overflow_policy', list(common.OverflowPolicy))
+async def test_send_queue(overflow_policy):
+    addr = tcp.Address('127.0.0.1', util.get_unused_tcp_port())
+    conn_queue = aio.Queue()
+
+    def get_snapshot():
+        return chatter.Data('snapshot', b'')
+
+    srv = await chatter.listen(conn_queue.put_nowait, addr)
+    conn = await chatter.connect(addr)
+    srv_conn = await conn_queue.get()
+
+    send_queue = common.SendQueue(conn=srv_conn,
+                                  snapshot_cb=get_snapshot,
+                                  queue_size=2,
+                                  overflow_policy=overflow_policy)
+
+    send_queue.send(chatter.Data('a', b'1'))
+    send_queue.send(chatter.Data('a', b'2'))
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('a', b'1')
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('a', b'2')
+
+    send_queue.send_snapshot()
+    send_queue.send(chatter.Data('a', b'3'))
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('snapshot', b'')
+
+    for i in range(3):
+        send_queue.send(chatter.Data('a', str(i).encode()))
+
+    if overflow_policy == common.OverflowPolicy.CLOSE:
+        await conn.wait_closed()
+
+    elif overflow_policy == common.OverflowPolicy.RESYNC:
+        msg = await conn.receive()
+        assert msg.data == chatter.Data('snapshot', b'')
+
+        send_queue.send(chatter.Data('a', b'4'))
+
+        msg = await conn.receive()
+        assert msg.data == chatter.Data('a', b'4')
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_send_queue_conflate():
+    addr = tcp.Address('127.0.0.1', util.get_unused_tcp_port())
+    conn_queue = aio.Queue()
+
+    def get_snapshot():
+        return chatter.Data('snapshot', b'')
+
+    srv = await chatter.listen(conn_queue.put_nowait, addr)
+    conn = await chatter.connect(addr)
+    srv_conn = await conn_queue.get()
+
+    send_queue = common.SendQueue(conn=srv_conn,
+                                  snapshot_cb=get_snapshot,
+                                  conflate=True)
+    assert send_queue.conflated_count == 0
+
+    send_queue.send(chatter.Data('a', b'1'))
+    assert send_queue.conflated_count == 0
+
+    send_queue.send(chatter.Data('a', b'2'))
+    send_queue.send(chatter.Data('a', b'3'))
+    assert send_queue.conflated_count == 3
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('snapshot', b'')
+
+    send_queue.send(chatter.Data('a', b'4'))
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('a', b'4')
+    assert send_queue.conflated_count == 3
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_send_queue_control():
+    addr = tcp.Address('127.0.0.1', util.get_unused_tcp_port())
+    conn_queue = aio.Queue()
+
+    def get_snapshot():
+        return chatter.Data('snapshot', b'')
+
+    srv = await chatter.listen(conn_queue.put_nowait, addr)
+    conn = await chatter.connect(addr)
+    srv_conn = await conn_queue.get()
+
+    send_queue = common.SendQueue(conn=srv_conn,
+                                  snapshot_cb=get_snapshot,
+                                  queue_size=2,
+                                  conflate=True)
+
+    send_queue.send_snapshot()
+    send_queue.send(chatter.Data('a', b'1'))
+    send_queue.send_control(chatter.Data('control', b'1'))
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('control', b'1')
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('snapshot', b'')
+
+    send_queue.send_control(chatter.Data('control', b'2'))
+    send_queue.send_control(chatter.Data('control', b'3'))
+    send_queue.send_control(chatter.Data('control', b'4'))
+
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('control', b'2')
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('control', b'3')
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('control', b'4')
+    msg = await conn.receive()
+    assert msg.data == chatter.Data('snapshot', b'')
+
+    await conn.async_close()
+    await srv.async_close()
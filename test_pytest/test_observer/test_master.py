@@ -57,6 +57,75 @@ async def test_active(addr):
     await master.async_close()
 
 
+async def test_standby(addr):
+    master = await hat.monitor.observer.master.listen(addr,
+                                                      accept_standby=True)
+
+    conn = await chatter.connect(addr)
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {'seq': 1,
+                                                          'components': []})
+    await conn.wait_closed()
+
+    conn = await chatter.connect(addr)
+    await common.send_msg(conn, 'HatObserver2.MsgStandby', None)
+
+    await asyncio.sleep(0.01)
+    assert conn.is_open
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 1,
+        'components': [common.component_info_to_sbs(infos[0])]})
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(common.receive_msg(conn), 0.01)
+    assert conn.is_open
+
+    master.set_active(True)
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgMaster'
+    assert msg_data['components'] == [common.component_info_to_sbs(
+        infos[0]._replace(mid=msg_data['mid']))]
+
+    master.set_active(False)
+    await conn.wait_closed()
+
+    conn = await chatter.connect(addr)
+    await common.send_msg(conn, 'HatObserver2.MsgStandby', None)
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {'seq': 1,
+                                                          'components': []})
+
+    await asyncio.sleep(0.01)
+    assert conn.is_open
+
+    master.set_active(False)
+    await conn.wait_closed()
+
+    await master.async_close()
+
+
+async def test_standby_promote_timeout(addr):
+    master = await hat.monitor.observer.master.listen(addr,
+                                                      accept_standby=True,
+                                                      promote_timeout=0.05)
+
+    conn = await chatter.connect(addr)
+    await common.send_msg(conn, 'HatObserver2.MsgStandby', None)
+
+    await asyncio.sleep(0.1)
+    assert conn.is_open
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {'seq': 1,
+                                                          'components': []})
+
+    await asyncio.sleep(0.01)
+    assert conn.is_open
+
+    await aio.wait_for(conn.wait_closed(), 1)
+
+    await master.async_close()
+
+
 async def test_msg_slave(addr):
     global_components_queue = aio.Queue()
 
@@ -72,12 +141,13 @@ async def test_msg_slave(addr):
     await asyncio.sleep(0.01)
     assert global_components_queue.empty()
 
-    await common.send_msg(conn, 'HatObserver.MsgSlave', {
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 1,
         'components': [common.component_info_to_sbs(info)
                        for info in infos]})
 
     msg_type, msg_data = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgMaster'
+    assert msg_type == 'HatObserver2.MsgMaster'
     mid = msg_data['mid']
 
     global_components = await global_components_queue.get()
@@ -85,7 +155,8 @@ async def test_msg_slave(addr):
                                  for info in infos]
     assert global_components == master.global_components
 
-    await common.send_msg(conn, 'HatObserver.MsgSlave', {
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 2,
         'components': []})
 
     global_components = await global_components_queue.get()
@@ -95,6 +166,75 @@ async def test_msg_slave(addr):
     await master.async_close()
 
 
+async def test_msg_slave_delta(addr):
+    global_components_queue = aio.Queue()
+
+    def on_global_components(master, components):
+        global_components_queue.put_nowait(components)
+
+    master = await hat.monitor.observer.master.listen(
+        addr, global_components_cb=on_global_components)
+    master.set_active(True)
+
+    conn = await chatter.connect(addr)
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 1,
+        'components': [common.component_info_to_sbs(info)
+                       for info in infos[:5]]})
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgMaster'
+    mid = msg_data['mid']
+
+    global_components = await global_components_queue.get()
+    assert global_components == [info._replace(mid=mid)
+                                 for info in infos[:5]]
+
+    changed_info = infos[0]._replace(rank=42)
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlaveDelta', {
+        'seq': 2,
+        'added': [common.component_info_to_sbs(info)
+                  for info in infos[5:]],
+        'changed': [common.component_info_to_sbs(changed_info)],
+        'removed': [infos[1].cid]})
+
+    global_components = await global_components_queue.get()
+    assert global_components == [info._replace(mid=mid)
+                                 for info in [changed_info, *infos[2:]]]
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlaveDelta', {
+        'seq': 4,
+        'added': [],
+        'changed': [],
+        'removed': [infos[2].cid]})
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgMasterDelta'
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgResync'
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlaveDelta', {
+        'seq': 5,
+        'added': [],
+        'changed': [],
+        'removed': [infos[3].cid]})
+
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 6,
+        'components': []})
+
+    global_components = await global_components_queue.get()
+    assert global_components == []
+
+    assert global_components_queue.empty()
+
+    await conn.async_close()
+    await master.async_close()
+
+
 async def test_msg_master(addr):
     master = await hat.monitor.observer.master.listen(addr)
     master.set_active(True)
@@ -104,23 +244,47 @@ async def test_msg_master(addr):
     with pytest.raises(asyncio.TimeoutError):
         await aio.wait_for(common.receive_msg(conn), 0.01)
 
-    await common.send_msg(conn, 'HatObserver.MsgSlave', {
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 1,
         'components': []})
 
     msg_type, msg_data = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgMaster'
+    assert msg_type == 'HatObserver2.MsgMaster'
     assert msg_data['mid'] > 0
     assert msg_data['components'] == []
     mid = msg_data['mid']
 
+    version = msg_data['version']
+
     await master.set_local_components(infos)
 
     msg_type, msg_data = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgMaster'
+    assert msg_type == 'HatObserver2.MsgMasterDelta'
+    assert msg_data['version'] == version + 1
+    assert msg_data['delta'] == common.components_delta_to_sbs(
+        common.ComponentsDelta(added=[info._replace(mid=0) for info in infos],
+                               changed=[],
+                               removed=[]))
+
+    await master.set_local_components(infos[1:])
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgMasterDelta'
+    assert msg_data['version'] == version + 2
+    assert msg_data['delta'] == common.components_delta_to_sbs(
+        common.ComponentsDelta(added=[],
+                               changed=[],
+                               removed=[(0, infos[0].cid)]))
+
+    await common.send_msg(conn, 'HatObserver2.MsgResync', None)
+
+    msg_type, msg_data = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgMaster'
     assert msg_data['mid'] == mid
+    assert msg_data['version'] == version + 2
     assert msg_data['components'] == [
         common.component_info_to_sbs(info._replace(mid=0))
-        for info in infos]
+        for info in infos[1:]]
 
     await conn.async_close()
     await master.async_close()
@@ -197,7 +361,8 @@ async def test_update_components_on_different_mids(addr):
     conn = await chatter.connect(addr)
     await asyncio.sleep(0.01)
 
-    await common.send_msg(conn, 'HatObserver.MsgSlave', {
+    await common.send_msg(conn, 'HatObserver2.MsgSlave', {
+        'seq': 1,
         'components': [common.component_info_to_sbs(c2)]})
 
     blessing_input_components = await blessing_input_components_queue.get()
@@ -268,3 +433,81 @@ async def test_set_local_blessing_reqs(addr):
     assert components_queue.empty()
 
     await master.async_close()
+
+
+async def test_set_local_components(addr):
+    components_queue = aio.Queue()
+    info = common.ComponentInfo(
+            cid=1,
+            mid=0,
+            name='c1',
+            group='g1',
+            data={'abc': [1, 2, 3]},
+            rank=1,
+            blessing_req=common.BlessingReq(token=None,
+                                            timestamp=None),
+            blessing_res=common.BlessingRes(token=None,
+                                            ready=True))
+
+    def on_components(master, components):
+        components_queue.put_nowait(components)
+
+    master = await hat.monitor.observer.master.listen(
+        addr,
+        global_components_cb=on_components)
+
+    local_components = [info]
+    await master.set_local_components(local_components)
+
+    components = await components_queue.get()
+    assert components == [info]
+
+    await master.set_local_components(local_components)
+    await master.set_local_components([info])
+    await master.set_local_components([info._replace()])
+
+    await asyncio.sleep(0.01)
+    assert components_queue.empty()
+
+    await master.set_local_components([info._replace(rank=2)])
+
+    components = await components_queue.get()
+    assert components == [info._replace(rank=2)]
+
+    await master.set_local_components([])
+
+    components = await components_queue.get()
+    assert components == []
+
+    await master.async_close()
+
+
+async def test_update_delay(addr):
+    components_queue = aio.Queue()
+    blessing_queue = aio.Queue()
+
+    def on_components(master, components):
+        components_queue.put_nowait(components)
+
+    def blessing(master, components):
+        blessing_queue.put_nowait(list(components))
+        return []
+
+    master = await hat.monitor.observer.master.listen(
+        addr,
+        update_delay=0.05,
+        global_components_cb=on_components,
+        blessing_cb=blessing)
+
+    for i in range(len(infos)):
+        await master.set_local_components(infos[:i + 1])
+
+    assert components_queue.empty()
+
+    components = await components_queue.get()
+    assert components == [info._replace(mid=0) for info in infos]
+    assert master.merged_updates == len(infos) - 1
+
+    assert blessing_queue.qsize() == 1
+
+    await master.async_close()
@@ -1,3 +1,4 @@
+import asyncio
 import collections
 
 import pytest
@@ -7,6 +8,7 @@ from hat import util
 from hat.drivers import chatter
 from hat.drivers import tcp
 
+from hat.monitor.observer import client
 from hat.monitor.observer import common
 from hat.monitor.observer import server
 
@@ -79,12 +81,15 @@ async def test_msg_client(addr):
     assert info.blessing_res.token is None
     assert info.blessing_res.ready is False
 
-    await common.send_msg(conn, 'HatObserver.MsgClient', {
+    await common.send_msg(conn, 'HatObserver2.MsgClient', {
         'name': 'name xyz',
         'group': 'group zyx',
         'data': '{"abc": 42}',
         'blessingRes': {'token': ('value', 123),
-                        'ready': True}})
+                        'ready': True,
+                        'standby': False},
+        'subscription': ('none', None),
+        'session': ('none', None)})
 
     state = await state_queue.get()
     assert state.mid == 0
@@ -112,11 +117,12 @@ async def test_msg_server(addr):
 
     msg_type, msg_data = await common.receive_msg(conn)
 
-    assert msg_type == 'HatObserver.MsgServer'
+    assert msg_type == 'HatObserver2.MsgServer'
     assert msg_data['mid'] == 0
     assert msg_data['components'] == []
 
     cid = msg_data['cid']
+    version = msg_data['version']
 
     info = common.ComponentInfo(
         cid=cid + 1,
@@ -134,10 +140,13 @@ async def test_msg_server(addr):
 
     msg_type, msg_data = await common.receive_msg(conn)
 
-    assert msg_type == 'HatObserver.MsgServer'
-    assert msg_data['cid'] == cid
+    assert msg_type == 'HatObserver2.MsgServerDelta'
     assert msg_data['mid'] == 42
-    assert msg_data['components'] == [common.component_info_to_sbs(info)]
+    assert msg_data['version'] == version + 1
+    assert msg_data['delta'] == common.components_delta_to_sbs(
+        common.ComponentsDelta(added=[info],
+                               changed=[],
+                               removed=[]))
 
     assert srv.state.mid == 42
     assert len(srv.state.local_components) == 1
@@ -147,6 +156,45 @@ async def test_msg_server(addr):
 
     assert srv.state.local_components[0].rank == -42
 
+    changed_info = info._replace(rank=123)
+    await srv.update(42, [changed_info])
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgServerDelta'
+    assert msg_data['mid'] == 42
+    assert msg_data['version'] == version + 2
+    assert msg_data['delta'] == common.components_delta_to_sbs(
+        common.ComponentsDelta(added=[],
+                               changed=[changed_info],
+                               removed=[]))
+
+    await srv.update(42, [])
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgServerDelta'
+    assert msg_data['mid'] == 42
+    assert msg_data['version'] == version + 3
+    assert msg_data['delta'] == common.components_delta_to_sbs(
+        common.ComponentsDelta(added=[],
+                               changed=[],
+                               removed=[(info.mid, info.cid)]))
+
+    conn2 = await chatter.connect(addr)
+
+    msg_type, msg_data = await common.receive_msg(conn2)
+
+    assert msg_type == 'HatObserver2.MsgServer'
+    assert msg_data['cid'] != cid
+    assert msg_data['mid'] == 42
+    assert msg_data['version'] == version + 3
+    assert msg_data['components'] == []
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(common.receive_msg(conn), 0.01)
+
+    await conn2.async_close()
     await conn.async_close()
     await srv.async_close()
 
@@ -156,7 +204,7 @@ async def test_msg_close(addr):
     conn = await chatter.connect(addr)
 
     msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgServer'
+    assert msg_type == 'HatObserver2.MsgServer'
 
     assert srv.is_open
     assert conn.is_open
@@ -164,7 +212,7 @@ async def test_msg_close(addr):
     srv.close()
 
     msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgClose'
+    assert msg_type == 'HatObserver2.MsgClose'
 
     assert srv.is_closing
     assert not srv.is_closed
@@ -175,49 +223,364 @@ async def test_msg_close(addr):
 
 
 async def test_rank_cache(addr):
-    srv = await server.listen(addr, default_rank=123)
+    state_queue = aio.Queue()
+
+    def on_state(srv, state):
+        state_queue.put_nowait(state)
+
+    srv = await server.listen(addr, default_rank=123, state_cb=on_state)
     conn = await chatter.connect(addr)
 
     msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgServer'
+    assert msg_type == 'HatObserver2.MsgServer'
 
-    assert srv.state.local_components[0].rank == 123
+    state = await state_queue.get()
+    assert state.local_components[0].rank == 123
 
-    await common.send_msg(conn, 'HatObserver.MsgClient', {
+    await common.send_msg(conn, 'HatObserver2.MsgClient', {
         'name': 'name',
         'group': 'group',
         'data': 'null',
         'blessingRes': {'token': ('none', None),
-                        'ready': False}})
+                        'ready': False,
+                        'standby': False},
+        'subscription': ('none', None),
+        'session': ('none', None)})
 
-    msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgServer'
-
-    assert srv.state.local_components[0].rank == 123
+    state = await state_queue.get()
+    assert state.local_components[0].rank == 123
 
     await srv.set_rank(srv.state.local_components[0].cid, 321)
 
-    assert srv.state.local_components[0].rank == 321
+    state = await state_queue.get()
+    assert state.local_components[0].rank == 321
 
     await conn.async_close()
+
+    state = await state_queue.get()
+    assert state.local_components == []
+
     conn = await chatter.connect(addr)
 
     msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgServer'
+    assert msg_type == 'HatObserver2.MsgServer'
 
-    assert srv.state.local_components[0].rank == 123
+    state = await state_queue.get()
+    assert state.local_components[0].rank == 123
 
-    await common.send_msg(conn, 'HatObserver.MsgClient', {
+    await common.send_msg(conn, 'HatObserver2.MsgClient', {
         'name': 'name',
         'group': 'group',
         'data': 'null',
         'blessingRes': {'token': ('none', None),
-                        'ready': False}})
+                        'ready': False,
+                        'standby': False},
+        'subscription': ('none', None),
+        'session': ('none', None)})
 
-    msg_type, _ = await common.receive_msg(conn)
-    assert msg_type == 'HatObserver.MsgServer'
+    state = await state_queue.get()
+    assert state.local_components[0].rank == 321
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_shared_msg_server_delta(addr):
+    srv = await server.listen(addr)
+
+    conns = []
+    for _ in range(3):
+        conn = await chatter.connect(addr)
+        conns.append(conn)
+
+        msg = await conn.receive()
+        assert msg.data.type == 'HatObserver2.MsgServer'
+
+    info = common.ComponentInfo(
+        cid=123,
+        mid=42,
+        name='name',
+        group='group',
+        data={'abc': 1},
+        rank=1,
+        blessing_req=common.BlessingReq(token=None,
+                                        timestamp=None),
+        blessing_res=common.BlessingRes(token=None,
+                                        ready=False))
+
+    await srv.update(42, [info])
+
+    msgs = [await conn.receive() for conn in conns]
+    assert all(msg.data.type == 'HatObserver2.MsgServerDelta'
+               for msg in msgs)
+    assert all(msg.data.data == msgs[0].data.data for msg in msgs)
+
+    for conn in conns:
+        await conn.async_close()
+
+    await srv.async_close()
+
+
+async def test_sbs_cache(addr):
+    srv = await server.listen(addr)
+
+    infos = [common.ComponentInfo(
+                cid=i,
+                mid=1,
+                name=f'name {i}',
+                group='group',
+                data={'abc': i},
+                rank=1,
+                blessing_req=common.BlessingReq(token=None,
+                                                timestamp=None),
+                blessing_res=common.BlessingRes(token=None,
+                                                ready=False))
+             for i in range(3)]
+
+    await srv.update(0, infos)
+
+    conns = []
+    for _ in range(3):
+        conn = await chatter.connect(addr)
+        conns.append(conn)
+
+        msg_type, msg_data = await common.receive_msg(conn)
+        assert msg_type == 'HatObserver2.MsgServer'
+        assert len(msg_data['components']) == len(infos)
+
+    assert srv.sbs_cache_info == common.CacheInfo(hits=6,
+                                                  misses=3,
+                                                  currsize=3)
+
+    await srv.update(0, infos[:1])
+
+    for conn in conns:
+        msg_type, msg_data = await common.receive_msg(conn)
+        assert msg_type == 'HatObserver2.MsgServerDelta'
+        assert len(msg_data['delta']['removed']) == 2
+
+    assert srv.sbs_cache_info.currsize == 1
+
+    for conn in conns:
+        await conn.async_close()
+
+    await srv.async_close()
+
+
+async def test_broadcast_delay(addr):
+    state_queue = aio.Queue()
+
+    def on_state(srv, state):
+        state_queue.put_nowait(state)
+
+    srv = await server.listen(addr,
+                              broadcast_delay=0.1,
+                              state_cb=on_state)
+
+    conns = []
+    for _ in range(5):
+        conn = await chatter.connect(addr)
+        conns.append(conn)
+
+    state = await state_queue.get()
+    assert len(state.local_components) == len(conns)
+    assert srv.merged_changes == len(conns) - 1
+
+    for conn in conns:
+        msg_type, msg_data = await common.receive_msg(conn)
+        assert msg_type == 'HatObserver2.MsgServer'
 
-    assert srv.state.local_components[0].rank == 321
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(state_queue.get(), 0.2)
+
+    for conn in conns:
+        await conn.async_close()
+
+    await srv.async_close()
+
+
+async def test_subscription(addr):
+    srv_state_queue = aio.Queue()
+
+    def on_srv_state(srv, state):
+        srv_state_queue.put_nowait(state)
+
+    async def wait_components(conn, names):
+        while sorted(i.name for i in conn.state.components) != names:
+            await asyncio.sleep(0.001)
+
+    srv = await server.listen(addr, state_cb=on_srv_state)
+
+    conn_all = await client.connect(addr, 'c1', 'g1')
+    conn_group = await client.connect(addr, 'c2', 'g2',
+                                      subscription=['g2'])
+    conn_other = await client.connect(addr, 'c3', 'g3',
+                                      subscription=['g1'])
+    conn_self = await client.connect(addr, 'c4', 'g2',
+                                     subscription=[])
+
+    while True:
+        state = await srv_state_queue.get()
+        if all(i.name is not None for i in state.local_components):
+            break
+
+    remote_info = state.local_components[0]._replace(mid=1,
+                                                     cid=1,
+                                                     name='remote',
+                                                     group='g2')
+    await srv.update(0, [*state.local_components, remote_info])
+
+    await aio.wait_for(
+        wait_components(conn_all, ['c1', 'c2', 'c3', 'c4', 'remote']), 1)
+    await aio.wait_for(
+        wait_components(conn_group, ['c2', 'c4', 'remote']), 1)
+    await aio.wait_for(
+        wait_components(conn_other, ['c1', 'c3']), 1)
+    await aio.wait_for(
+        wait_components(conn_self, ['c4']), 1)
+
+    assert conn_self.state.info.name == 'c4'
+    assert conn_other.state.info.name == 'c3'
+
+    await srv.update(0, [*state.local_components,
+                         remote_info._replace(group='g1')])
+
+    await aio.wait_for(
+        wait_components(conn_group, ['c2', 'c4']), 1)
+    await aio.wait_for(
+        wait_components(conn_other, ['c1', 'c3', 'remote']), 1)
+    await aio.wait_for(
+        wait_components(conn_self, ['c4']), 1)
+
+    await srv.update(0, state.local_components)
+
+    await aio.wait_for(
+        wait_components(conn_all, ['c1', 'c2', 'c3', 'c4']), 1)
+    await aio.wait_for(
+        wait_components(conn_group, ['c2', 'c4']), 1)
+    await aio.wait_for(
+        wait_components(conn_other, ['c1', 'c3']), 1)
+
+    for conn in [conn_all, conn_group, conn_other, conn_self]:
+        await conn.async_close()
+
+    await srv.async_close()
+
+
+async def test_state_version(addr):
+    state_queue = aio.Queue()
+
+    def on_state(srv, state):
+        state_queue.put_nowait(state)
+
+    srv = await server.listen(addr, state_cb=on_state)
+    assert srv.state.version == 0
+
+    conn = await chatter.connect(addr)
+
+    state = await state_queue.get()
+    assert state.version == 1
+    assert srv.state is state
 
+    global_components = list(state.local_components)
+    await srv.update(0, global_components)
+
+    state = await state_queue.get()
+    assert state.version == 2
+    assert state.global_components is global_components
+
+    await srv.update(0, global_components)
+    assert state_queue.empty()
+
+    await srv.update(0, list(global_components))
+
+    state = await state_queue.get()
+    assert state.version == 3
+
+    await srv.set_rank(state.local_components[0].cid, 42)
+
+    state = await state_queue.get()
+    assert state.version == 4
+    assert state.local_components[0].rank == 42
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_session_resume(addr):
+
+    async def wait_until(cond):
+        while not cond():
+            await srv.update(0, srv.state.local_components)
+            await asyncio.sleep(0.001)
+
+    srv = await server.listen(addr, session_timeout=0.1)
+
+    conn = await client.connect(addr, 'name', 'group')
+    await aio.wait_for(wait_until(lambda: conn.state.info and
+                                  conn.state.info.name == 'name'), 1)
+
+    session = conn.session
+    cid = conn.state.info.cid
+    assert session is not None
+
+    await srv.set_rank(cid, 42)
     await conn.async_close()
+
+    await asyncio.sleep(0.01)
+    assert [i.cid for i in srv.state.local_components] == [cid]
+
+    blessing_res = common.BlessingRes(token=1, ready=True)
+    conn = await client.connect(addr, 'name', 'group',
+                                blessing_res=blessing_res,
+                                session=session)
+    await aio.wait_for(wait_until(lambda: conn.state.info and
+                                  conn.state.info.blessing_res.ready), 1)
+
+    assert conn.state.info.cid == cid
+    assert conn.state.info.rank == 42
+    assert conn.session == session
+    assert [i.cid for i in srv.state.local_components] == [cid]
+
+    takeover_conn = await client.connect(addr, 'name', 'group',
+                                         blessing_res=blessing_res,
+                                         session=session)
+    await conn.wait_closed()
+    await aio.wait_for(wait_until(lambda: takeover_conn.state.info and
+                                  takeover_conn.state.info.cid == cid), 1)
+    assert [i.cid for i in srv.state.local_components] == [cid]
+
+    await takeover_conn.async_close()
+    await aio.wait_for(wait_until(lambda: not srv.state.local_components), 1)
+
+    conn = await client.connect(addr, 'name', 'group',
+                                session=session)
+    await aio.wait_for(wait_until(lambda: conn.state.info and
+                                  conn.state.info.name == 'name'), 1)
+
+    assert conn.state.info.cid != cid
+    assert conn.session != session
+    assert len(srv.state.local_components) == 1
+
+    await conn.async_close()
+    await srv.async_close()
+
+
+async def test_session_disabled(addr):
+    srv = await server.listen(addr)
+
+    conn = await client.connect(addr, 'name', 'group')
+    while not srv.state.local_components:
+        await asyncio.sleep(0.001)
+
+    await srv.update(0, srv.state.local_components)
+    while not conn.state.info:
+        await asyncio.sleep(0.001)
+
+    assert conn.session is None
+
+    await conn.async_close()
+    await asyncio.sleep(0.01)
+    assert srv.state.local_components == []
+
     await srv.async_close()
@@ -57,8 +57,9 @@ async def test_msg_slave(addr):
 
     msg_type, msg_data = await common.receive_msg(conn)
 
-    assert msg_type == 'HatObserver.MsgSlave'
-    assert msg_data == {'components': []}
+    assert msg_type == 'HatObserver2.MsgSlave'
+    assert msg_data == {'seq': 1,
+                        'components': []}
 
     with pytest.raises(asyncio.TimeoutError):
         await aio.wait_for(common.receive_msg(conn), 0.01)
@@ -67,10 +68,81 @@ async def test_msg_slave(addr):
 
     msg_type, msg_data = await common.receive_msg(conn)
 
-    assert msg_type == 'HatObserver.MsgSlave'
-    assert msg_data == {'components': [common.component_info_to_sbs(info)
+    assert msg_type == 'HatObserver2.MsgSlaveDelta'
+    assert msg_data == {'seq': 2,
+                        'added': [common.component_info_to_sbs(info)
+                                  for info in infos],
+                        'changed': [],
+                        'removed': []}
+
+    await slave.update(infos)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(common.receive_msg(conn), 0.01)
+
+    changed_info = infos[1]._replace(rank=42)
+    await slave.update([changed_info, *infos[2:]])
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgSlaveDelta'
+    assert msg_data == {'seq': 3,
+                        'added': [],
+                        'changed': [common.component_info_to_sbs(
+                            changed_info)],
+                        'removed': [infos[0].cid]}
+
+    await common.send_msg(conn, 'HatObserver2.MsgResync', None)
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgSlave'
+    assert msg_data == {'seq': 4,
+                        'components': [common.component_info_to_sbs(info)
+                                       for info in [changed_info,
+                                                    *infos[2:]]]}
+
+    await slave.async_close()
+    await srv.async_close()
+
+
+async def test_standby(addr):
+    conn_queue = aio.Queue()
+    srv = await chatter.listen(conn_queue.put_nowait, addr)
+
+    slave = await hat.monitor.observer.slave.connect(addr, standby=True)
+    conn = await conn_queue.get()
+
+    assert slave.is_standby
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgStandby'
+    assert msg_data is None
+
+    await slave.update(infos)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(common.receive_msg(conn), 0.01)
+
+    await slave.promote()
+    assert not slave.is_standby
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgSlave'
+    assert msg_data == {'seq': 1,
+                        'components': [common.component_info_to_sbs(info)
                                        for info in infos]}
 
+    await slave.update(infos[1:])
+
+    msg_type, msg_data = await common.receive_msg(conn)
+
+    assert msg_type == 'HatObserver2.MsgSlaveDelta'
+    assert msg_data['seq'] == 2
+    assert msg_data['removed'] == [infos[0].cid]
+
     await slave.async_close()
     await srv.async_close()
 
@@ -89,8 +161,9 @@ async def test_msg_master(addr):
 
     assert state_queue.empty()
 
-    await common.send_msg(conn, 'HatObserver.MsgMaster', {
+    await common.send_msg(conn, 'HatObserver2.MsgMaster', {
         'mid': 42,
+        'version': 1,
         'components': []})
 
     state = await state_queue.get()
@@ -101,8 +174,9 @@ async def test_msg_master(addr):
 
     assert state_queue.empty()
 
-    await common.send_msg(conn, 'HatObserver.MsgMaster', {
+    await common.send_msg(conn, 'HatObserver2.MsgMaster', {
         'mid': 24,
+        'version': 2,
         'components': [common.component_info_to_sbs(info)
                        for info in infos]})
 
@@ -111,6 +185,81 @@ async def test_msg_master(addr):
     assert state == slave.state
     assert state.mid == 24
     assert state.global_components == infos
+    assert state.version == 2
+
+    await common.send_msg(conn, 'HatObserver2.MsgMaster', {
+        'mid': 24,
+        'version': 2,
+        'components': [common.component_info_to_sbs(info)
+                       for info in infos]})
+
+    with pytest.raises(asyncio.TimeoutError):
+        await aio.wait_for(state_queue.get(), 0.01)
+
+    await slave.async_close()
+    await srv.async_close()
+
+
+async def test_msg_master_delta(addr):
+    state_queue = aio.Queue()
+
+    def on_state(slave, state):
+        state_queue.put_nowait(state)
+
+    conn_queue = aio.Queue()
+    srv = await chatter.listen(conn_queue.put_nowait, addr)
+
+    slave = await hat.monitor.observer.slave.connect(addr, state_cb=on_state)
+    conn = await conn_queue.get()
+
+    msg_type, _ = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgSlave'
+
+    await common.send_msg(conn, 'HatObserver2.MsgMaster', {
+        'mid': 42,
+        'version': 1,
+        'components': [common.component_info_to_sbs(info)
+                       for info in infos[:5]]})
+
+    state = await state_queue.get()
+    assert state.mid == 42
+    assert state.global_components == infos[:5]
+
+    changed_info = infos[0]._replace(rank=42)
+
+    await common.send_msg(conn, 'HatObserver2.MsgMasterDelta', {
+        'version': 2,
+        'delta': common.components_delta_to_sbs(
+            common.ComponentsDelta(
+                added=infos[5:],
+                changed=[changed_info],
+                removed=[(infos[1].mid, infos[1].cid)]))})
+
+    state = await state_queue.get()
+    assert state == slave.state
+    assert state.mid == 42
+    assert state.global_components == [changed_info, *infos[2:]]
+
+    await common.send_msg(conn, 'HatObserver2.MsgMasterDelta', {
+        'version': 4,
+        'delta': common.components_delta_to_sbs(
+            common.ComponentsDelta(added=[],
+                                   changed=[],
+                                   removed=[]))})
+
+    msg_type, _ = await common.receive_msg(conn)
+    assert msg_type == 'HatObserver2.MsgResync'
+
+    await common.send_msg(conn, 'HatObserver2.MsgMaster', {
+        'mid': 42,
+        'version': 4,
+        'components': []})
+
+    state = await state_queue.get()
+    assert state.mid == 42
+    assert state.global_components == []
+
+    assert state_queue.empty()
 
     await slave.async_close()
     await srv.async_close()
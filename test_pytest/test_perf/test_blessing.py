@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from hat.monitor import common
+from hat.monitor.server import blessing
+
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.mark.parametrize('implementation', ['calculate', 'vectorized'])
+@pytest.mark.parametrize('group_count', [10, 1000])
+@pytest.mark.parametrize('component_count', [50000])
+def test_calculate(implementation, group_count, component_count):
+    if implementation == 'vectorized':
+        pytest.importorskip('numpy')
+
+    components = [
+        common.ComponentInfo(
+            cid=i,
+            mid=i % 7,
+            name=f'name{i}',
+            group=f'group{i % group_count}',
+            data=None,
+            rank=i % 3,
+            blessing_req=common.BlessingReq(token=None,
+                                            timestamp=None),
+            blessing_res=common.BlessingRes(token=None,
+                                            ready=True))
+        for i in range(component_count)]
+
+    calculate = (blessing.calculate if implementation == 'calculate'
+                 else blessing.calculate_vectorized)
+
+    start = time.perf_counter()
+    changes = list(calculate(components=components,
+                             group_algorithms={},
+                             default_algorithm=blessing.Algorithm.BLESS_ONE))
+    dt = time.perf_counter() - start
+
+    assert len(changes) == group_count
+
+    print(f'{implementation} (component count: {component_count}; '
+          f'group count: {group_count}): {dt:.6f}s')
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+import pytest
+
+from hat import util
+from hat.drivers import chatter
+from hat.drivers import tcp
+
+from hat.monitor.observer import server
+
+
+pytestmark = pytest.mark.perf
+
+
+async def measure_set_rank(conn_count, update_count):
+    addr = tcp.Address('127.0.0.1', util.get_unused_tcp_port())
+    srv = await server.listen(addr, broadcast_delay=60)
+
+    conns = [await chatter.connect(addr) for _ in range(conn_count)]
+    while len(srv.state.local_components) < conn_count:
+        await asyncio.sleep(0.01)
+
+    cids = [i.cid for i in srv.state.local_components]
+
+    start = time.perf_counter()
+    for i in range(update_count):
+        await srv.set_rank(cids[i % conn_count], i)
+    dt = time.perf_counter() - start
+
+    for conn in conns:
+        await conn.async_close()
+
+    await srv.async_close()
+
+    return dt
+
+
+@pytest.mark.parametrize('update_count', [10000])
+async def test_set_rank(update_count):
+    conn_counts = [10, 100, 500]
+    durations = {}
+
+    for conn_count in conn_counts:
+        dt = await measure_set_rank(conn_count, update_count)
+        durations[conn_count] = dt
+
+        print(f'set rank (conn count: {conn_count}; '
+              f'update count: {update_count}): {dt:.6f}s')
+
+    # duration of set rank should not depend on number of local components
+    # (with list based local components, it grows linearly)
+    assert durations[conn_counts[-1]] < 3 * durations[conn_counts[0]]
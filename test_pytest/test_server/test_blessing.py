@@ -1,3 +1,5 @@
+import random
+
 import pytest
 
 from hat.monitor import common
@@ -254,3 +256,577 @@ def test_bless_all(algorithm, components, blessing_reqs):
     for info, blessing_req in zip(components, blessing_reqs):
         result = changes.get((info.mid, info.cid), info.blessing_req)
         assert_blessing_req_equal(result, blessing_req)
+
+
+@pytest.mark.parametrize("algorithm, components, blessing_reqs",
+                         test_bless_all.pytestmark[0].args[1])
+@pytest.mark.parametrize('implementation', ['engine', 'vectorized'])
+def test_bless_all_implementations(algorithm, components, blessing_reqs,
+                                   implementation):
+    if implementation == 'engine':
+        engine = blessing.Engine(group_algorithms={},
+                                 default_algorithm=algorithm)
+        result = engine.calculate(components)
+
+    elif implementation == 'vectorized':
+        pytest.importorskip('numpy')
+        result = blessing.calculate_vectorized(components=components,
+                                               group_algorithms={},
+                                               default_algorithm=algorithm)
+
+    else:
+        raise ValueError('unsupported implementation')
+
+    changes = {(mid, cid): blessing_req
+               for mid, cid, blessing_req in result}
+
+    for info, blessing_req in zip(components, blessing_reqs):
+        result = changes.get((info.mid, info.cid), info.blessing_req)
+        assert_blessing_req_equal(result, blessing_req)
+
+
+def test_engine():
+    engine = blessing.Engine(
+        group_algorithms={'g1': blessing.Algorithm.BLESS_ONE},
+        default_algorithm=blessing.Algorithm.BLESS_ALL)
+    assert engine.stats == blessing.EngineStats(evaluated_groups=0,
+                                                skipped_groups=0)
+
+    components = [
+        *group_component_infos(blessing_reqs=[no_blessing, no_blessing],
+                               blessing_ress=[ready, ready],
+                               ranks=[1, 2],
+                               group='g1'),
+        *group_component_infos(blessing_reqs=[no_blessing, no_blessing],
+                               blessing_ress=[ready, not_ready],
+                               ranks=[1, 1],
+                               starting_cid=2,
+                               group='g2')]
+
+    changes = engine.calculate(components)
+    assert {(mid, cid) for mid, cid, _ in changes} == {(0, 0), (0, 2)}
+    assert engine.stats == blessing.EngineStats(evaluated_groups=2,
+                                                skipped_groups=0)
+
+    for mid, cid, blessing_req in changes:
+        components[cid] = components[cid]._replace(blessing_req=blessing_req)
+
+    changes = engine.calculate(components)
+    assert changes == []
+    assert engine.stats == blessing.EngineStats(evaluated_groups=4,
+                                                skipped_groups=0)
+
+    changes = engine.calculate(components)
+    assert changes == []
+    assert engine.stats == blessing.EngineStats(evaluated_groups=4,
+                                                skipped_groups=2)
+
+    components[3] = components[3]._replace(blessing_res=ready)
+
+    changes = engine.calculate(components)
+    assert [(mid, cid) for mid, cid, _ in changes] == [(0, 3)]
+    assert engine.stats == blessing.EngineStats(evaluated_groups=5,
+                                                skipped_groups=3)
+
+    changes = engine.calculate(components[1:])
+    assert [(mid, cid) for mid, cid, _ in changes] == [(0, 1)]
+    assert engine.stats == blessing.EngineStats(evaluated_groups=6,
+                                                skipped_groups=4)
+
+
+def test_engine_stats():
+    engine = blessing.Engine(group_algorithms={},
+                             default_algorithm=blessing.Algorithm.BLESS_ALL)
+    assert engine.stats == blessing.EngineStats()
+
+
+@pytest.mark.parametrize('seed', range(50))
+@pytest.mark.parametrize('component_count', [1, 10, 100])
+def test_calculate_vectorized(seed, component_count):
+    pytest.importorskip('numpy')
+    rng = random.Random(seed)
+
+    def random_blessing_req():
+        return common.BlessingReq(
+            token=rng.choice([None, 0, 1, 2, 3]),
+            timestamp=rng.choice([None, 0, 1.0, 2.0, 3.0]))
+
+    def random_blessing_res():
+        return common.BlessingRes(token=rng.choice([None, 0, 1, 2, 3]),
+                                  ready=rng.choice([True, False]))
+
+    components = [
+        component_info(cid=cid,
+                       mid=rng.randint(0, 3),
+                       group=rng.choice(['g1', 'g2', 'g3', 'g4', None]),
+                       data=rng.choice([None, {'load': rng.randint(0, 2)}]),
+                       rank=rng.randint(1, 3),
+                       blessing_req=random_blessing_req(),
+                       blessing_res=random_blessing_res())
+        for cid in range(component_count)]
+
+    group_algorithms = {'g1': blessing.Algorithm.BLESS_ALL,
+                        'g2': blessing.Algorithm.BLESS_ONE,
+                        'g3': blessing.AlgorithmConf(
+                            algorithm=blessing.Algorithm.BLESS_N,
+                            count=2),
+                        'g4': blessing.AlgorithmConf(
+                            algorithm=blessing.Algorithm.BLESS_ONE,
+                            load_key='load')}
+    default_algorithm = rng.choice(list(blessing.Algorithm))
+
+    def normalize(changes):
+        return [(mid, cid, blessing_req if blessing_req == no_blessing
+                 else generic_blessing)
+                for mid, cid, blessing_req in changes]
+
+    result = blessing.calculate(components=components,
+                                group_algorithms=group_algorithms,
+                                default_algorithm=default_algorithm)
+    vectorized_result = blessing.calculate_vectorized(
+        components=components,
+        group_algorithms=group_algorithms,
+        default_algorithm=default_algorithm)
+
+    assert normalize(vectorized_result) == normalize(result)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_bless_n_single(seed):
+    rng = random.Random(seed)
+
+    components = [
+        component_info(
+            cid=cid,
+            mid=rng.randint(0, 3),
+            rank=rng.randint(1, 3),
+            blessing_req=common.BlessingReq(
+                token=rng.choice([None, 1, 2]),
+                timestamp=rng.choice([None, 1.0, 2.0])),
+            blessing_res=common.BlessingRes(
+                token=rng.choice([None, 1, 2]),
+                ready=rng.choice([True, False])))
+        for cid in range(10)]
+
+    def calculate(algorithm):
+        return [(mid, cid, blessing_req == no_blessing)
+                for mid, cid, blessing_req in blessing.calculate(
+                    components=components,
+                    group_algorithms={},
+                    default_algorithm=algorithm)]
+
+    assert (calculate(blessing.AlgorithmConf(blessing.Algorithm.BLESS_N,
+                                             count=1)) ==
+            calculate(blessing.Algorithm.BLESS_ONE))
+
+
+def test_bless_n():
+    algorithm = blessing.AlgorithmConf(algorithm=blessing.Algorithm.BLESS_N,
+                                       count=2)
+
+    def calculate(components):
+        changes = {(mid, cid): blessing_req
+                   for mid, cid, blessing_req in blessing.calculate(
+                        components=components,
+                        group_algorithms={},
+                        default_algorithm=algorithm)}
+        return [changes.get((c.mid, c.cid), c.blessing_req)
+                for c in components]
+
+    components = group_component_infos(
+        blessing_reqs=[no_blessing] * 4,
+        blessing_ress=[ready, ready, not_ready, ready],
+        ranks=[2, 1, 1, 1])
+
+    blessing_reqs = calculate(components)
+    for blessing_req, expected in zip(blessing_reqs, [no_blessing,
+                                                      generic_blessing,
+                                                      no_blessing,
+                                                      generic_blessing]):
+        assert_blessing_req_equal(blessing_req, expected)
+
+    # components 1 and 3 are active
+    components = [
+        c._replace(blessing_req=blessing_req,
+                   blessing_res=(
+                       common.BlessingRes(token=blessing_req.token,
+                                          ready=True)
+                       if blessing_req.token else c.blessing_res))
+        for c, blessing_req in zip(components, blessing_reqs)]
+
+    assert calculate(components) == [c.blessing_req for c in components]
+
+    # component 2 becomes ready - active components are preserved
+    components[2] = components[2]._replace(blessing_res=ready)
+
+    assert calculate(components) == [c.blessing_req for c in components]
+
+    # component 3 rank increased - blessing is transferred to component 2
+    # only after component 3 revokes its response token
+    components[3] = components[3]._replace(rank=3)
+
+    blessing_reqs = calculate(components)
+    assert blessing_reqs == [no_blessing,
+                             components[1].blessing_req,
+                             no_blessing,
+                             no_blessing]
+
+    components[3] = components[3]._replace(blessing_req=no_blessing,
+                                           blessing_res=ready)
+
+    blessing_reqs = calculate(components)
+    for blessing_req, expected in zip(blessing_reqs,
+                                      [no_blessing,
+                                       components[1].blessing_req,
+                                       generic_blessing,
+                                       no_blessing]):
+        assert_blessing_req_equal(blessing_req, expected)
+
+
+@pytest.mark.parametrize('algorithm', [blessing.Algorithm.BLESS_ONE,
+                                       blessing.Algorithm.BLESS_N])
+def test_load_aware(algorithm):
+    algorithm_conf = blessing.AlgorithmConf(algorithm=algorithm,
+                                            load_key='load')
+
+    def calculate(components):
+        changes = {(mid, cid): blessing_req
+                   for mid, cid, blessing_req in blessing.calculate(
+                        components=components,
+                        group_algorithms={'group': algorithm_conf},
+                        default_algorithm=blessing.Algorithm.BLESS_ALL)}
+        return [changes.get((c.mid, c.cid), c.blessing_req)
+                for c in components]
+
+    components = [
+        component_info(cid=0, group='group', data={'load': 0.5},
+                       blessing_res=ready),
+        component_info(cid=1, group='group', data={'load': 0.2},
+                       blessing_res=ready),
+        component_info(cid=2, group='group', data=None,
+                       blessing_res=ready),
+        component_info(cid=3, group='group', data={'load': 0.1},
+                       rank=2, blessing_res=ready)]
+
+    blessing_reqs = calculate(components)
+    for blessing_req, expected in zip(blessing_reqs, [no_blessing,
+                                                      generic_blessing,
+                                                      no_blessing,
+                                                      no_blessing]):
+        assert_blessing_req_equal(blessing_req, expected)
+
+    components[1] = components[1]._replace(data={'load': 'invalid'})
+
+    blessing_reqs = calculate(components)
+    for blessing_req, expected in zip(blessing_reqs, [generic_blessing,
+                                                      no_blessing,
+                                                      no_blessing,
+                                                      no_blessing]):
+        assert_blessing_req_equal(blessing_req, expected)
+
+
+@pytest.mark.parametrize('algorithm', [blessing.Algorithm.BLESS_ONE,
+                                       blessing.Algorithm.BLESS_N])
+def test_load_aware_active(algorithm):
+    algorithm_conf = blessing.AlgorithmConf(algorithm=algorithm,
+                                            load_key='load')
+
+    components = [
+        component_info(cid=0, group='group', data={'load': 50},
+                       blessing_req=common.BlessingReq(token=1,
+                                                       timestamp=1.0),
+                       blessing_res=common.BlessingRes(token=1,
+                                                       ready=True)),
+        component_info(cid=1, group='group', data={'load': 1},
+                       blessing_res=ready)]
+
+    changes = list(blessing.calculate(
+        components=components,
+        group_algorithms={'group': algorithm_conf},
+        default_algorithm=blessing.Algorithm.BLESS_ALL))
+    assert changes == []
+
+
+@pytest.mark.parametrize('algorithm', [blessing.Algorithm.BLESS_ONE,
+                                       blessing.Algorithm.BLESS_N])
+def test_hysteresis(monkeypatch, algorithm):
+    now = 1000
+    monkeypatch.setattr(blessing.time, 'time', lambda: now)
+
+    engine = blessing.Engine(
+        group_algorithms={'g': blessing.AlgorithmConf(algorithm=algorithm,
+                                                      hold_down=10,
+                                                      min_tenure=5)},
+        default_algorithm=blessing.Algorithm.BLESS_ALL)
+
+    def calculate(components):
+        changes = engine.calculate(components)
+        for mid, cid, blessing_req in changes:
+            components[cid] = components[cid]._replace(
+                blessing_req=blessing_req)
+        return changes
+
+    components = [component_info(cid=0, group='g', rank=2,
+                                 blessing_res=ready)]
+
+    calculate(components)
+    assert components[0].blessing_req != no_blessing
+    assert engine.next_calculation is None
+
+    components[0] = components[0]._replace(
+        blessing_res=components[0].blessing_res._replace(
+            token=components[0].blessing_req.token))
+
+    now = 1001
+    components.append(component_info(cid=1, group='g', rank=1,
+                                     blessing_res=ready))
+
+    assert calculate(components) == []
+    assert engine.stats.suppressed_transfers == 1
+    assert engine.next_calculation == 1011
+
+    components[1] = components[1]._replace(blessing_res=not_ready)
+    now = 1005
+
+    assert calculate(components) == []
+    assert engine.next_calculation is None
+
+    components[1] = components[1]._replace(blessing_res=ready)
+    now = 1006
+
+    assert calculate(components) == []
+    assert engine.stats.suppressed_transfers == 2
+    assert engine.next_calculation == 1016
+
+    now = 1010
+
+    assert calculate(components) == []
+    assert engine.stats.suppressed_transfers == 2
+
+    now = 1016
+
+    assert calculate(components) == [(0, 0, no_blessing)]
+    assert engine.next_calculation is None
+
+    components[0] = components[0]._replace(
+        blessing_res=components[0].blessing_res._replace(token=None))
+
+    calculate(components)
+    assert components[0].blessing_req == no_blessing
+    assert components[1].blessing_req != no_blessing
+    assert engine.stats.suppressed_transfers == 2
+
+
+def test_hysteresis_bless_n(monkeypatch):
+    now = 1000
+    monkeypatch.setattr(blessing.time, 'time', lambda: now)
+
+    engine = blessing.Engine(
+        group_algorithms={},
+        default_algorithm=blessing.AlgorithmConf(
+            algorithm=blessing.Algorithm.BLESS_N,
+            count=2,
+            min_tenure=5))
+
+    def calculate(components):
+        changes = engine.calculate(components)
+        for mid, cid, blessing_req in changes:
+            components[cid] = components[cid]._replace(
+                blessing_req=blessing_req,
+                blessing_res=components[cid].blessing_res._replace(
+                    token=blessing_req.token))
+        return changes
+
+    components = [component_info(cid=0, rank=2, blessing_res=ready)]
+
+    calculate(components)
+    assert components[0].blessing_req != no_blessing
+
+    now = 1001
+    components.extend([component_info(cid=1, rank=1, blessing_res=ready),
+                       component_info(cid=2, rank=1, blessing_res=ready)])
+
+    changes = calculate(components)
+    assert [(mid, cid) for mid, cid, _ in changes] == [(0, 1)]
+    assert components[0].blessing_req != no_blessing
+    assert components[1].blessing_req != no_blessing
+    assert components[2].blessing_req == no_blessing
+    assert engine.stats.suppressed_transfers == 1
+    assert engine.next_calculation == 1005
+
+    now = 1005
+
+    assert calculate(components) == [(0, 0, no_blessing)]
+
+    calculate(components)
+    assert components[0].blessing_req == no_blessing
+    assert components[1].blessing_req != no_blessing
+    assert components[2].blessing_req != no_blessing
+
+
+def test_hysteresis_removed(monkeypatch):
+    now = 1000
+    monkeypatch.setattr(blessing.time, 'time', lambda: now)
+
+    engine = blessing.Engine(
+        group_algorithms={},
+        default_algorithm=blessing.AlgorithmConf(
+            algorithm=blessing.Algorithm.BLESS_ONE,
+            hold_down=10,
+            min_tenure=5))
+
+    def get_components():
+        blessing_req = common.BlessingReq(token=123,
+                                          timestamp=now)
+        blessing_res = common.BlessingRes(token=123,
+                                          ready=True)
+        return [component_info(cid=0, rank=2,
+                               blessing_req=blessing_req,
+                               blessing_res=blessing_res),
+                component_info(cid=1, rank=1, blessing_res=ready)]
+
+    assert engine.calculate(get_components()) == []
+    assert engine.stats.suppressed_transfers == 1
+
+    assert engine.calculate([]) == []
+    assert engine.next_calculation is None
+
+    now = 1001
+
+    assert engine.calculate(get_components()) == []
+    assert engine.stats.suppressed_transfers == 2
+    assert engine.next_calculation == 1011
+
+
+def test_hysteresis_not_ready(monkeypatch):
+    monkeypatch.setattr(blessing.time, 'time', lambda: 1000)
+
+    engine = blessing.Engine(
+        group_algorithms={},
+        default_algorithm=blessing.AlgorithmConf(
+            algorithm=blessing.Algorithm.BLESS_ONE,
+            hold_down=10,
+            min_tenure=10))
+
+    components = [component_info(cid=0, rank=1, blessing_res=ready),
+                  component_info(cid=1, rank=2, blessing_res=ready)]
+
+    changes = engine.calculate(components)
+    assert [(mid, cid) for mid, cid, _ in changes] == [(0, 0)]
+
+    components[0] = components[0]._replace(blessing_req=changes[0][2],
+                                           blessing_res=not_ready)
+
+    changes = dict(((mid, cid), blessing_req)
+                   for mid, cid, blessing_req in engine.calculate(components))
+    assert changes[0, 0] == no_blessing
+    assert changes[0, 1] != no_blessing
+    assert engine.stats.suppressed_transfers == 0
+
+
+@pytest.mark.parametrize('algorithm', [blessing.Algorithm.BLESS_ONE,
+                                       blessing.Algorithm.BLESS_N])
+def test_standby(algorithm):
+    algorithm_conf = blessing.AlgorithmConf(algorithm=algorithm,
+                                            standby=True)
+
+    def calculate(components):
+        changes = blessing.calculate(
+            components=components,
+            group_algorithms={},
+            default_algorithm=algorithm_conf)
+        for mid, cid, blessing_req in changes:
+            components[cid] = components[cid]._replace(
+                blessing_req=blessing_req)
+
+    components = group_component_infos(
+        blessing_reqs=[no_blessing, no_blessing, no_blessing],
+        blessing_ress=[ready, ready, not_ready],
+        ranks=[1, 2, 1])
+
+    calculate(components)
+    assert components[0].blessing_req.token is not None
+    assert components[0].blessing_req.standby is False
+    assert components[1].blessing_req == no_blessing._replace(standby=True)
+    assert components[2].blessing_req == no_blessing
+
+    components[2] = components[2]._replace(blessing_res=ready)
+
+    calculate(components)
+    assert components[0].blessing_req.token is not None
+    assert components[1].blessing_req == no_blessing
+    assert components[2].blessing_req == no_blessing._replace(standby=True)
+
+    components[0] = components[0]._replace(blessing_res=not_ready)
+
+    calculate(components)
+    assert components[0].blessing_req == no_blessing
+    assert components[1].blessing_req == no_blessing._replace(standby=True)
+    assert components[2].blessing_req.token is not None
+    assert components[2].blessing_req.standby is False
+
+
+@pytest.mark.parametrize('handover', [True, False])
+def test_handover(monkeypatch, handover):
+    now = 1000
+    monkeypatch.setattr(blessing.time, 'time', lambda: now)
+
+    engine = blessing.Engine(
+        group_algorithms={},
+        default_algorithm=blessing.AlgorithmConf(
+            algorithm=blessing.Algorithm.BLESS_ONE,
+            handover=handover))
+
+    def calculate():
+        changes = engine.calculate(components)
+        for mid, cid, blessing_req in changes:
+            components[cid] = components[cid]._replace(
+                blessing_req=blessing_req)
+        return {cid: blessing_req for _, cid, blessing_req in changes}
+
+    def set_res(cid, **kwargs):
+        components[cid] = components[cid]._replace(
+            blessing_res=components[cid].blessing_res._replace(**kwargs))
+
+    components = group_component_infos(
+        blessing_reqs=[no_blessing, no_blessing],
+        blessing_ress=[ready, ready],
+        ranks=[1, 2])
+
+    calculate()
+    set_res(0, token=components[0].blessing_req.token)
+    calculate()
+    assert engine.stats.downtime == 0
+
+    components[0] = components[0]._replace(rank=3)
+    changes = calculate()
+
+    if handover:
+        assert changes == {}
+        assert components[1].blessing_req.standby is True
+
+        set_res(1, standby=True)
+        changes = calculate()
+
+        assert changes[0] == no_blessing
+        assert changes[1].token is not None
+
+    else:
+        assert changes == {0: no_blessing}
+
+        now = 1001
+        set_res(0, token=None)
+        changes = calculate()
+
+        assert changes[1].token is not None
+
+    now = 1002
+    set_res(1, token=components[1].blessing_req.token, standby=False)
+    calculate()
+
+    set_res(0, token=None)
+    calculate()
+
+    assert components[0].blessing_req.token is None
+    assert components[1].blessing_req.token is not None
+    assert engine.stats.downtime == (0 if handover else 1)
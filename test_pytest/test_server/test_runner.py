@@ -0,0 +1,240 @@
+import asyncio
+
+from hat import aio
+from hat import json
+from hat import util
+from hat.drivers import tcp
+
+from hat.monitor import common
+from hat.monitor.observer import client
+from hat.monitor.observer import slave
+from hat.monitor.server import runner
+
+
+host = '127.0.0.1'
+
+
+def create_conf(parents=[], master_conf={}, slave_conf={}):
+    conf = {'type': 'monitor',
+            'default_algorithm': 'BLESS_ALL',
+            'group_algorithms': {},
+            'server': {'host': host,
+                       'port': util.get_unused_tcp_port(),
+                       'default_rank': 1},
+            'master': {'host': host,
+                       'port': util.get_unused_tcp_port(),
+                       **master_conf},
+            'slave': {'parents': [{'host': host,
+                                   'port': parent['master']['port']}
+                                  for parent in parents],
+                      'connect_timeout': 0.1,
+                      'connect_retry_count': 1,
+                      'connect_retry_delay': 0.05,
+                      **slave_conf}}
+
+    validator = json.DefaultSchemaValidator(common.json_schema_repo)
+    validator.validate('hat-monitor://server.yaml', conf)
+
+    return conf
+
+
+async def connect_client(conf, name):
+    addr = tcp.Address(host, conf['server']['port'])
+    return await client.connect(addr, name=name, group='group')
+
+
+def get_names(conn):
+    return {info.name for info in conn.state.components}
+
+
+def is_connected(srv_runner, addr):
+    return (srv_runner._slave_addr == addr and
+            srv_runner._slave is not None and
+            srv_runner._slave.is_open and
+            srv_runner._slave.state.mid is not None)
+
+
+async def wait_until(cond, timeout=5):
+
+    async def wait():
+        while not cond():
+            await asyncio.sleep(0.01)
+
+    await aio.wait_for(wait(), timeout)
+
+
+async def test_connect_retry_backoff():
+    unreachable_conf = {'master': {'port': util.get_unused_tcp_port()}}
+    conf = create_conf(parents=[unreachable_conf],
+                       slave_conf={'connect_retry_count': 5,
+                                   'connect_retry_delay': 0.01,
+                                   'connect_retry_max_delay': 0.04,
+                                   'connect_retry_jitter': True})
+
+    srv_runner = await runner.create(conf)
+    conn = await connect_client(conf, 'c')
+
+    await wait_until(lambda: get_names(conn) == {'c'})
+
+    await conn.async_close()
+    await srv_runner.async_close()
+
+
+async def test_connect_stagger():
+    unreachable_conf = {'master': {'port': util.get_unused_tcp_port()}}
+    conf1 = create_conf()
+    conf2 = create_conf()
+    conf3 = create_conf(parents=[unreachable_conf, conf1],
+                        slave_conf={'connect_stagger': 0.05})
+
+    runner1 = await runner.create(conf1)
+    client1 = await connect_client(conf1, 'c1')
+
+    runner3 = await runner.create(conf3)
+    client3 = await connect_client(conf3, 'c3')
+
+    await wait_until(lambda: get_names(client1) == {'c1', 'c3'})
+    await wait_until(lambda: get_names(client3) == {'c1', 'c3'})
+
+    await runner3.async_close()
+    await client3.async_close()
+
+    conf3 = create_conf(parents=[conf1, conf2],
+                        slave_conf={'connect_stagger': 0})
+
+    runner2 = await runner.create(conf2)
+    client2 = await connect_client(conf2, 'c2')
+
+    runner3 = await runner.create(conf3)
+    client3 = await connect_client(conf3, 'c3')
+
+    await wait_until(lambda: ('c3' in get_names(client1) or
+                              'c3' in get_names(client2)))
+    await asyncio.sleep(0.1)
+
+    assert ('c3' in get_names(client1)) != ('c3' in get_names(client2))
+
+    for resource in [client1, client2, client3, runner1, runner2, runner3]:
+        await resource.async_close()
+
+
+async def test_standby_links():
+    conf1 = create_conf(master_conf={'accept_standby': True})
+    conf2 = create_conf(parents=[conf1],
+                        master_conf={'accept_standby': True})
+    conf3 = create_conf(parents=[conf1, conf2],
+                        slave_conf={'standby_links': True})
+    addr2 = tcp.Address(host, conf2['master']['port'])
+
+    runner1 = await runner.create(conf1)
+    client1 = await connect_client(conf1, 'c1')
+
+    runner2 = await runner.create(conf2)
+    client2 = await connect_client(conf2, 'c2')
+
+    runner3 = await runner.create(conf3)
+    client3 = await connect_client(conf3, 'c3')
+
+    await wait_until(lambda: get_names(client1) == {'c1', 'c2', 'c3'})
+    await wait_until(lambda: get_names(client2) == {'c1', 'c2', 'c3'})
+    await wait_until(lambda: addr2 in runner3._standby_slaves)
+
+    standby_slave = runner3._standby_slaves[addr2]
+    assert standby_slave.is_standby
+
+    await runner1.async_close()
+    await client1.async_close()
+
+    await wait_until(lambda: is_connected(runner3, addr2))
+    await wait_until(lambda: get_names(client2) == {'c2', 'c3'})
+    await wait_until(lambda: get_names(client3) == {'c2', 'c3'})
+
+    assert runner3._slave is standby_slave
+    assert not standby_slave.is_standby
+    assert standby_slave.is_open
+
+    for resource in [client2, client3, runner2, runner3]:
+        await resource.async_close()
+
+
+async def test_standby_links_promote_failure(monkeypatch):
+
+    async def promote(self):
+        raise ConnectionError()
+
+    monkeypatch.setattr(slave.Slave, 'promote', promote)
+
+    conf1 = create_conf(master_conf={'accept_standby': True})
+    conf2 = create_conf(parents=[conf1],
+                        master_conf={'accept_standby': True})
+    conf3 = create_conf(parents=[conf1, conf2],
+                        slave_conf={'standby_links': True})
+    addr2 = tcp.Address(host, conf2['master']['port'])
+
+    runner1 = await runner.create(conf1)
+    client1 = await connect_client(conf1, 'c1')
+
+    runner2 = await runner.create(conf2)
+    client2 = await connect_client(conf2, 'c2')
+
+    runner3 = await runner.create(conf3)
+    client3 = await connect_client(conf3, 'c3')
+
+    await wait_until(lambda: get_names(client1) == {'c1', 'c2', 'c3'})
+    await wait_until(lambda: addr2 in runner3._standby_slaves)
+
+    standby_slave = runner3._standby_slaves[addr2]
+
+    await runner1.async_close()
+    await client1.async_close()
+
+    await wait_until(lambda: is_connected(runner3, addr2))
+    await wait_until(lambda: get_names(client2) == {'c2', 'c3'})
+    await wait_until(lambda: get_names(client3) == {'c2', 'c3'})
+
+    assert runner3._slave is not standby_slave
+    assert not runner3._slave.is_standby
+    assert standby_slave.is_closed
+
+    for resource in [client2, client3, runner2, runner3]:
+        await resource.async_close()
+
+
+async def test_standby_promote_timeout():
+    conf1 = create_conf(master_conf={'accept_standby': True})
+    conf2 = create_conf(parents=[conf1],
+                        master_conf={'accept_standby': True,
+                                     'standby_promote_timeout': 0.1})
+    conf3 = create_conf(parents=[conf1, conf2],
+                        slave_conf={'standby_links': True})
+    addr1 = tcp.Address(host, conf1['master']['port'])
+    addr2 = tcp.Address(host, conf2['master']['port'])
+
+    runner1 = await runner.create(conf1)
+    client1 = await connect_client(conf1, 'c1')
+
+    runner2 = await runner.create(conf2)
+    client2 = await connect_client(conf2, 'c2')
+
+    runner3 = await runner.create(conf3)
+    client3 = await connect_client(conf3, 'c3')
+
+    await wait_until(lambda: get_names(client1) == {'c1', 'c2', 'c3'})
+    await wait_until(lambda: (addr1 not in runner3._standby_slaves and
+                              addr2 in runner3._standby_slaves))
+
+    standby_slave = runner3._standby_slaves[addr2]
+
+    # connection to runner1 is lost while runner2 remains slave of runner1 -
+    # promoted connection to inactive runner2 is held only until timeout
+    runner3._slave.close()
+
+    await wait_until(lambda: runner3._slave is standby_slave)
+    await wait_until(lambda: 'c3' not in get_names(client1))
+
+    await wait_until(lambda: standby_slave.is_closed, timeout=1)
+    await wait_until(lambda: is_connected(runner3, addr1))
+    await wait_until(lambda: get_names(client1) == {'c1', 'c2', 'c3'})
+
+    for resource in [client1, client2, client3, runner1, runner2, runner3]:
+        await resource.async_close()